@@ -2,510 +2,343 @@ import threading
 from flask import Flask, jsonify, request, render_template, url_for,session,redirect
 import mysql.connector
 import os
-import pandas as pd
-import matplotlib
-matplotlib.use('Agg')  
-import matplotlib.pyplot as plt
-import seaborn as sns
-import io
-import base64
-import sys
+import hashlib
 import time
 import bcrypt 
 from flask_session import Session
+from rating_stats import apply_rating_deltas, genre_signature
+from predictors import DEFAULT_PREDICTOR, PREDICTOR_CLASSES, load_predictors
+from autocomplete import NameIndex
+from build_progress import BuildProgress
+from genre_stats import (
+    GENRE_STATS_STEPS, GENRE_STATS_VERSION, apply_histogram_deltas, load_user_stats, mark_stats_built, rebuild_genre_stats,
+    rebuild_user_genre_stats, refresh_user_genre_stats, stats_are_current
+)
+from charts import ChartRenderer, ChartUnavailable, render_genre_boxplot
+from data_versions import VersionedCache, bump_versions, read_versions
+from db_pool import ConnectionPool, PoolError
+from summaries import (
+    BUILD_STEPS, SUMMARIES, SUMMARY_ENGINE, SUMMARY_VERSION, apply_user_rating_deltas, mark_summaries_built, rebuild_summaries,
+    rebuild_user_summaries, refresh_user_summaries, summaries_are_current
+)
+from summary_engine import VECTOR_BUILD_STEPS, rebuild_summaries_vectorised
+from summary_index import SummaryIndex
+from search import (
+    count_movies, decode_cursor, encode_cursor, filter_signature, find_movie_id, hydrate_movies,
+    parse_search_filters, search_movie_ids
+)
+from ttl_cache import TTLCache
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.config['SECRET_KEY'] = 'my_secret_key'
 app.config['SESSION_TYPE'] = 'filesystem'
 Session(app)
 print("Secret Key:", app.config['SECRET_KEY'])
-progress = {"low": 0, "high": 0}
 
-def update_progress(key, start, end, duration):
-    """
-    Simulate progress update by increasing progress[key] from start to end over 'duration' seconds.
-    """
-    steps = end - start
-    if steps <= 0:
-        return
-    delay = duration / steps
-    for p in range(start + 1, end + 1):
-        progress[key] = p
-        time.sleep(delay)
-def print_progress_bar(prefix, key):
-    """
-    Continuously print a progress bar in the terminal for the given key.
-    The progress bar updates based on the value of progress[key] (0 to 100).
+DB_POOL = ConnectionPool(
+    size=int(os.environ.get("DB_POOL_SIZE", 10)),
+    acquire_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 5)),
+    host=os.environ.get("DATABASE_HOST", "database"),
+    user=os.environ.get("DATABASE_USER", "root"),
+    password=os.environ.get("DATABASE_PASSWORD", "example"),
+    database=os.environ.get("DATABASE_NAME", "moviedb"),
+    connection_timeout=5
+)
+
+def db_cursor(**cursor_args):
+    """Checks out a pooled connection and cursor for a with block: `with db_cursor() as (conn, cursor):`."""
+    return DB_POOL.cursor(**cursor_args)
+
+@app.errorhandler(PoolError)
+def database_unavailable(err):
+    print(f"Database connection failed: {err}")
+    return jsonify({"error": "Failed to connect to the database"}), 503
+
+def load_data_versions():
+    with db_cursor() as (conn, cursor):
+        return read_versions(cursor)
+
+RESPONSE_CACHE = VersionedCache(load_data_versions, float(os.environ.get("CACHE_VERSION_CHECK_SECONDS", 2)))
+REFERENCE_MAX_AGE = int(os.environ.get("REFERENCE_MAX_AGE", 60))
+
+def commit_and_bump(conn, cursor, tables):
+    """Bumps the data versions of the tables a route changed, commits, and expires this process's cached responses."""
+    bump_versions(cursor, tables)
+    conn.commit()
+    RESPONSE_CACHE.expire()
+
+def cached_json(key, depends_on, build, cache_control):
+    """Serves build()'s JSON from RESPONSE_CACHE with an ETag, answering If-None-Match with 304."""
+    def encode():
+        body = f"{app.json.dumps(build())}\n".encode("utf-8")
+        return body, hashlib.sha1(body).hexdigest()
+
+    body, etag = RESPONSE_CACHE.get(key, depends_on, encode)
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response.make_conditional(request)
+
+SUMMARY_ENGINES = {
+    "sql": (rebuild_summaries, BUILD_STEPS),
+    "pandas": (rebuild_summaries_vectorised, VECTOR_BUILD_STEPS),
+}
+if SUMMARY_ENGINE not in SUMMARY_ENGINES:
+    print(f"⚠️ Unknown SUMMARY_ENGINE {SUMMARY_ENGINE!r}; building summaries with the sql engine.")
+build_summaries, summary_steps = SUMMARY_ENGINES.get(SUMMARY_ENGINE, SUMMARY_ENGINES["sql"])
+SUMMARY_PROGRESS = BuildProgress("Rating Summaries", summary_steps)
+GENRE_STATS_PROGRESS = BuildProgress("Genre Rating Stats", GENRE_STATS_STEPS)
+SUMMARY_REBUILD_LOCK = threading.Lock()
+# MySQL named lock held around the background builds, so the servers sharing a database (or the Werkzeug reloader's
+# two processes) never build into the same _next and scratch tables at once
+SUMMARY_BUILD_DB_LOCK = "rating_summaries"
+RERATED_USERS = {}  # BuildProgress of each running full build -> users whose ratings committed during it
+RERATED_LOCK = threading.Lock()
+
+def rebuild_if_stale(progress, is_current, build, mark_built, catch_up=None, force=False):
+    """Runs build(conn, progress) unless is_current(cursor) says its tables already reflect every rating.
+
+    Users who rate while it runs update the tables its swap replaces; catch_up(cursor, user_ids) recomputes them
+    afterwards. The build is only marked current once no caught-up user is left, under RERATED_LOCK so no rating
+    can commit between reading the user_ratings version and recording it.
     """
-    bar_length = 50  # Length of the progress bar in characters
-    last_percent = -1
-    while progress[key] < 100:
-        percent = progress[key]
-        if percent != last_percent:
-            filled_length = int(round(bar_length * percent / 100))
-            bar = '#' * filled_length + '-' * (bar_length - filled_length)
-            sys.stdout.write(f'\r{prefix}: [{bar}] {percent}%')
-            sys.stdout.flush()
-            last_percent = percent
-        time.sleep(0.1)
-    # Print final state at 100%
-    filled_length = bar_length
-    bar = '#' * filled_length
-    sys.stdout.write(f'\r{prefix}: [{bar}] 100%\n')
-    sys.stdout.flush()
-
-def get_db_connection():
     try:
-        connection = mysql.connector.connect(
-            host=os.environ.get("DATABASE_HOST", "database"),
-            user=os.environ.get("DATABASE_USER", "root"),
-            password=os.environ.get("DATABASE_PASSWORD", "example"),
-            database=os.environ.get("DATABASE_NAME", "moviedb"),
-            connection_timeout=5
-        )
-        return connection
+        with db_cursor() as (conn, cursor):
+            if not force and is_current(cursor):
+                progress.finish("skipped", "up to date with user_ratings")
+                return
+            if catch_up:
+                with RERATED_LOCK:
+                    RERATED_USERS[progress] = set()
+            try:
+                build(conn, progress)
+                while True:
+                    with RERATED_LOCK:
+                        users = sorted(RERATED_USERS.get(progress, ()))
+                        if not users:
+                            conn.commit()  # ends any older snapshot, so the version read below is the latest
+                            mark_built(cursor, read_versions(cursor).get("user_ratings", 0))
+                            conn.commit()
+                            break
+                        RERATED_USERS[progress].clear()
+                    # Outside the lock: these users' own POST /ratings may still hold their rows
+                    catch_up(cursor, users)
+                    conn.commit()
+                    print(f"🔄 {progress.name}: caught up {len(users)} users who rated during the rebuild")
+            finally:
+                with RERATED_LOCK:
+                    RERATED_USERS.pop(progress, None)
+        RESPONSE_CACHE.expire()
+    except PoolError as err:
+        progress.finish("failed", f"Failed to connect to the database ({err})")
     except mysql.connector.Error as err:
-        print(f"Database connection failed: {err}")
-        return None
+        # A failed build has already reported itself; don't let it stop the builds queued after it
+        if progress.state != "failed":
+            progress.finish("failed", str(err))
 
-def simulate_progress(prefix, duration=3):
-    """
-    Simulates a continuous progress bar in the terminal.
-    prefix: A string label (e.g., "Low Rated Summary")
-    duration: Total time (in seconds) over which to simulate progress.
-    """
-    bar_length = 50  # characters long progress bar
-    for i in range(101):  # from 0% to 100%
-        filled_length = int(round(bar_length * i / 100))
-        bar = '#' * filled_length + '-' * (bar_length - filled_length)
-        sys.stdout.write(f'\r{prefix}: [{bar}] {i}%')
-        sys.stdout.flush()
-        time.sleep(duration / 101)  # adjust duration to spread over the given time
-    sys.stdout.write('\n')
-
-def init_low_rated_summary():
-    global progress
-    progress["low"] = 0  # Reset progress for low-rated summary
-    conn = get_db_connection()
-    if conn is None:
-        print("Low Rated Summary: Failed to connect to the database")
-        return
+def init_rating_summaries(force=False):
+    """Fully rebuilds user_genre_totals and every band's summary unless they already reflect every rating.
 
-    # Create summary table if not exists and check if data already exists
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS low_rated_summary (
-            userId INT,
-            low_rated_genre VARCHAR(255),
-            other_genre VARCHAR(255),
-            avg_other_rating FLOAT,
-            rating_count INT,
-            PRIMARY KEY (userId, low_rated_genre, other_genre)
-        )
-    """)
-    conn.commit()
-    cursor.execute("SELECT COUNT(*) as count FROM low_rated_summary")
-    result = cursor.fetchone()
-    if result and result["count"] > 0:
-        print("Low Rated Summary already contains data. Skipping re-import.")
-        cursor.close()
-        conn.close()
-        return
+    Ratings added through /ratings keep them current incrementally; ratings loaded by the importer
+    (or a forced rebuild) make them stale, and this fallback rebuilds them from scratch.
+    """
+    rebuild_if_stale(SUMMARY_PROGRESS, summaries_are_current, build_summaries, mark_summaries_built,
+                     rebuild_user_summaries, force)
 
-    # Start a thread to continuously print the progress bar
-    low_progress_thread = threading.Thread(target=print_progress_bar, args=("Low Rated Summary", "low"), daemon=True)
-    low_progress_thread.start()
-
-    print("\nStarting low rated summary initialization...")
-    update_progress("low", 0, 30, duration=2)  # Simulate progress 0% to 30%
-
-    print("\nCreating and populating temporary table for low ratings...")
-    create_and_populate_low_rated_temp_table(conn, "WHERE r.rating < 3.0")
-    update_progress("low", 30, 50, duration=1)  # Simulate progress 30% to 50%
-
-    print("\nTruncating (empty) result table for low ratings...")
-    cursor.execute("TRUNCATE TABLE low_rated_summary")
-    update_progress("low", 50, 80, duration=2)  # Simulate progress 50% to 80%
-
-    print("\nCalculating and inserting summary data for low ratings...")
-    cursor.execute("""
-            INSERT IGNORE INTO low_rated_summary (userId, low_rated_genre, other_genre, avg_other_rating, rating_count)
-            SELECT lr.userId, lr.genre AS low_rated_genre, g.genre_name AS other_genre, 
-                   AVG(r.rating) AS avg_other_rating, COUNT(r.rating) AS rating_count
-            FROM low_rated lr
-            JOIN user_ratings r ON lr.userId = r.userId
-            JOIN movies m ON r.movieId = m.movieId
-            JOIN movie_genres mg ON m.movieId = mg.movieId
-            JOIN genres g ON mg.genreId = g.id
-            WHERE r.movieId != lr.movieId               
-            GROUP BY lr.userId, lr.genre, g.genre_name
-            HAVING COUNT(r.rating) > 5
-    """)
-    update_progress("low", 80, 100, duration=1)  # Simulate progress 80% to 100%
-
-    print(f"\nLow Rated Summary: {cursor.rowcount} rows inserted.")
-    conn.commit()
-    low_progress_thread.join()  # Wait for the progress bar thread to finish
-    print("Low Rated Summary initialization complete.")
-    cursor.close()
-    conn.close()
-
-def init_high_rated_summary():
-    global progress
-    progress["high"] = 0  # Reset progress for high-rated summary
-    conn = get_db_connection()
-    if conn is None:
-        print("High Rated Summary: Failed to connect to the database")
-        return
+def init_genre_stats(force=False):
+    """Rebuilds the per-user genre rating histogram and box plot statistics when they are stale, like the summaries."""
+    rebuild_if_stale(GENRE_STATS_PROGRESS, stats_are_current, rebuild_genre_stats, mark_stats_built,
+                     rebuild_user_genre_stats, force)
 
-    # Create summary table if not exists and check if data already exists
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS high_rated_summary (
-            userId INT,
-            high_rated_genre VARCHAR(255),
-            other_genre VARCHAR(255),
-            avg_other_rating FLOAT,
-            rating_count INT,
-            PRIMARY KEY (userId, high_rated_genre, other_genre)
-        )
-    """)
-    conn.commit()
-    cursor.execute("SELECT COUNT(*) as count FROM high_rated_summary")
-    result = cursor.fetchone()
-    if result and result["count"] > 0:
-        print("High Rated Summary already contains data. Skipping re-import.")
-        cursor.close()
-        conn.close()
+def background_summary_init(force=False):
+    if not SUMMARY_REBUILD_LOCK.acquire(blocking=False):
         return
-
-    # Start a thread to continuously print the progress bar for high ratings
-    high_progress_thread = threading.Thread(target=print_progress_bar, args=("High Rated Summary", "high"), daemon=True)
-    high_progress_thread.start()
-
-    print("\nStarting high rated summary initialization...")
-    update_progress("high", 0, 30, duration=2)  # Simulate progress 0% to 30%
-
-    print("\nCreating and populating temporary table for high ratings...")
-    create_and_populate_high_rated_temp_table(conn, "WHERE r.rating > 4.0")
-    update_progress("high", 30, 50, duration=1)  # Simulate progress 30% to 50%
-
-    print("\nTruncating (empty) result table for high ratings...")
-    cursor.execute("TRUNCATE TABLE high_rated_summary")
-    update_progress("high", 50, 80, duration=2)  # Simulate progress 50% to 80%
-
-    print("\nCalculating and inserting summary data for high ratings...")
-    cursor.execute("""
-            INSERT IGNORE INTO high_rated_summary (userId, high_rated_genre, other_genre, avg_other_rating, rating_count)
-            SELECT lr.userId, lr.genre AS high_rated_genre, g.genre_name AS other_genre, 
-                   AVG(r.rating) AS avg_other_rating, COUNT(r.rating) AS rating_count
-            FROM high_rated lr
-            JOIN user_ratings r ON lr.userId = r.userId
-            JOIN movies m ON r.movieId = m.movieId
-            JOIN movie_genres mg ON m.movieId = mg.movieId
-            JOIN genres g ON mg.genreId = g.id
-            WHERE r.movieId != lr.movieId
-            GROUP BY lr.userId, lr.genre, g.genre_name
-            HAVING COUNT(r.rating) > 5
-    """)
-    update_progress("high", 80, 100, duration=1)  # Simulate progress 80% to 100%
-
-    print(f"\nHigh Rated Summary: {cursor.rowcount} rows inserted.")
-    conn.commit()
-    high_progress_thread.join()  # Wait for the progress bar thread to finish
-    print("High Rated Summary initialization complete.")
-    cursor.close()
-    conn.close()
-
-
-def create_and_populate_low_rated_temp_table(conn, condition_query, params=None):
-    cursor = conn.cursor()
-    try:
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS low_rated (
-                userId INT NOT NULL,
-                movieId INT NOT NULL,
-                rating FLOAT NOT NULL,
-                title VARCHAR(255) NOT NULL,
-                genre VARCHAR(50) NOT NULL,
-                PRIMARY KEY (userId, movieId, genre)
-            )
-        """)
-
-        cursor.execute("TRUNCATE TABLE low_rated")
-
-        cursor.execute(f"""
-            INSERT IGNORE INTO low_rated (userId, movieId, rating, title, genre)
-            SELECT r.userId, r.movieId, r.rating, m.title, g.genre_name
-            FROM user_ratings r
-            JOIN movies m ON r.movieId = m.movieId
-            JOIN movie_genres mg ON m.movieId = mg.movieId
-            JOIN genres g ON mg.genreId = g.id
-            {condition_query}
-        """, params or ())
-        conn.commit()
-        print("low_rated temporary table created and populated successfully.")
-    except mysql.connector.Error as err:
-        print(f"Failed to create or populate low_rated temp table: {err}")
-        conn.rollback()
-        raise
-    finally:
-        cursor.close()
-
-
-def create_and_populate_high_rated_temp_table(conn, condition_query, params=None):
-    cursor = conn.cursor()
     try:
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS high_rated (
-                userId INT NOT NULL,
-                movieId INT NOT NULL,
-                rating FLOAT NOT NULL,
-                title VARCHAR(255) NOT NULL,
-                genre VARCHAR(50) NOT NULL,
-                PRIMARY KEY (userId, movieId, genre)
-            )
-        """)
-
-        cursor.execute("TRUNCATE TABLE high_rated")
-
-        cursor.execute(f"""
-            INSERT IGNORE INTO high_rated (userId, movieId, rating, title, genre)
-            SELECT r.userId, r.movieId, r.rating, m.title, g.genre_name
-            FROM user_ratings r
-            JOIN movies m ON r.movieId = m.movieId
-            JOIN movie_genres mg ON m.movieId = mg.movieId
-            JOIN genres g ON mg.genreId = g.id
-            {condition_query}
-        """, params or ())
-        conn.commit()
-        print("high_rated temporary table created and populated successfully.")
-    except mysql.connector.Error as err:
-        print(f"Failed to create or populate high_rated temp table: {err}")
-        conn.rollback()
-        raise
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT GET_LOCK(%s, 0)", (SUMMARY_BUILD_DB_LOCK,))
+            if cursor.fetchone()[0] != 1:
+                for progress in (SUMMARY_PROGRESS, GENRE_STATS_PROGRESS):
+                    progress.finish("skipped", "another server is rebuilding")
+                return
+            try:
+                init_rating_summaries(force)
+                init_genre_stats(force)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (SUMMARY_BUILD_DB_LOCK,))
+                cursor.fetchone()
+    except (PoolError, mysql.connector.Error) as err:
+        print(f"⚠️ Summary builds not started: {err}")
     finally:
-        cursor.close()
-
+        SUMMARY_REBUILD_LOCK.release()
 
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
+SEARCH_PAGE_SIZE_LIMIT = 100
+# Tables whose version bumps invalidate cached search pages and totals (rating writes bump movies)
+SEARCH_DEPENDS_ON = ("actors", "directors", "genres", "languages", "movie_genres", "movies")
+SEARCH_RESULTS = TTLCache(
+    maxsize=int(os.environ.get("SEARCH_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("SEARCH_CACHE_TTL", 300))
+)
+# Totals are shared by every page of a search
+SEARCH_COUNTS = TTLCache(maxsize=1024, ttl=float(os.environ.get("SEARCH_COUNT_TTL", 300)))
+
 @app.route("/search", methods=["GET"])
 def search_movies():
-    """Search for movies based on filters with pagination."""
-    query = request.args.get("q", "").strip()
-    genres = request.args.get("genres", "").strip().split(",") if request.args.get("genres") else []
-    min_rating = request.args.get("min_rating", "").strip()
-    max_rating = request.args.get("max_rating", "").strip()
-    director = request.args.get("director", "").strip()
-    actor = request.args.get("actor", "").strip()
-    release_date_from = request.args.get("releaseDateFrom", "").strip()
-    release_date_to = request.args.get("releaseDateTo", "").strip()
-    min_runtime = request.args.get("min_runtime", "").strip()
-    max_runtime = request.args.get("max_runtime", "").strip()
-    language = request.args.get("language", "").strip()
-    min_oscars = request.args.get("minOscars", "").strip()
-    min_golden_globes = request.args.get("minGoldenGlobes", "").strip()
-    min_baftas = request.args.get("minBAFTAs", "").strip()
-    
-    # Pagination parameters
+    """Search for movies based on filters with pagination.
+
+    Pass the returned next_cursor as ?cursor= to fetch the following page; ?page= still jumps to a numbered page.
+    ?include_total=false skips the (cached) total count.
+    """
     try:
-        page = int(request.args.get("page", 1))
+        filters = parse_search_filters(request.args)
     except ValueError:
-        page = 1
+        return jsonify({"error": "Numeric filters must be numbers"}), 400
+
+    # Pagination parameters
     try:
-        page_size = int(request.args.get("page_size", 20))
+        page_size = min(max(int(request.args.get("page_size", 20)), 1), SEARCH_PAGE_SIZE_LIMIT)
     except ValueError:
         page_size = 20
-    offset = (page - 1) * page_size
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    # Build a common base query with all filters
-    base_query = """
-        FROM movies
-        LEFT JOIN movie_genres ON movies.movieId = movie_genres.movieId
-        LEFT JOIN genres ON movie_genres.genreId = genres.id
-        LEFT JOIN movie_directors ON movies.movieId = movie_directors.movieId
-        LEFT JOIN directors ON movie_directors.director_id = directors.id
-        LEFT JOIN movie_actors ON movies.movieId = movie_actors.movieId
-        LEFT JOIN actors ON movie_actors.actor_id = actors.id
-        LEFT JOIN ratings ON movies.movieId = ratings.movieId
-        LEFT JOIN awards ON movies.movieId = awards.movieId
-        LEFT JOIN languages ON movies.language_id = languages.id
-        WHERE 1=1
+    after = None
+    page = None
+    offset = 0
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"], filters)
+        except ValueError as err:
+            return jsonify({"error": f"Invalid cursor: {err}"}), 400
+    else:
+        try:
+            page = max(int(request.args.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        offset = (page - 1) * page_size
+    include_total = request.args.get("include_total", "true").lower() not in ("false", "0", "no")
+    signature = filter_signature(filters)
+
+    # ✅ Equivalent filter sets share cache entries; a data version bump makes every older entry unreachable
+    stamp = RESPONSE_CACHE.stamp(SEARCH_DEPENDS_ON)
+    cache_key = (signature, stamp, page_size, page, tuple(after) if after else None, include_total)
+    result = SEARCH_RESULTS.get(cache_key)
+    if result is None:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            # ✅ Filter and page on ids first, then load only that page's details
+            if include_total:
+                total = SEARCH_COUNTS.get_or_set((signature, stamp), lambda: count_movies(cursor, filters))
+            else:
+                total = None
+            movie_ids, next_key = search_movie_ids(cursor, filters, page_size, offset, after)
+            movies = hydrate_movies(cursor, movie_ids)
+        result = {
+            "page": page,
+            "page_size": page_size,
+            "total": total,
+            "movies": movies,
+            "next_cursor": encode_cursor(next_key, signature) if next_key else None
+        }
+        SEARCH_RESULTS.set(cache_key, result)
+
+    return jsonify(result)
+
+MOVIES_PAGE_LIMIT = int(os.environ.get("MOVIES_PAGE_LIMIT", 1000))
+STREAM_BATCH_SIZE = 500
+
+def stream_movies(after_movie_id, limit):
+    """Yields movies as NDJSON lines, read through an unbuffered (server-side) cursor a batch at a time.
+
+    The first yield is an empty string once the query is running, so callers can prime the generator
+    and surface connection errors before the response starts.
     """
-    query_params = []
-
-    if query:
-        base_query += " AND LOWER(movies.title) LIKE LOWER(%s)"
-        query_params.append(f"%{query}%")
-
-    if genres:
-        base_query += """
-            AND movies.movieId IN (
-                SELECT mg.movieId FROM movie_genres mg 
-                JOIN genres g ON mg.genreId = g.id 
-                WHERE g.genre_name IN ({})
-            )
-        """.format(", ".join(["%s"] * len(genres)))
-        query_params.extend(genres)
-
-    if director:
-        # Split the incoming string on commas and remove extra spaces
-        directors_list = [d.strip() for d in director.split(",") if d.strip()]
-        if directors_list:
-            # Build OR conditions for each director
-            director_conditions = " OR ".join(["d.director_name LIKE %s"] * len(directors_list))
-            base_query += f"""
-                AND movies.movieId IN (
-                    SELECT md.movieId FROM movie_directors md 
-                    JOIN directors d ON md.director_id = d.id 
-                    WHERE {director_conditions}
-                )
-            """
-            # Append a parameter for each director condition
-            for d in directors_list:
-                query_params.append(f"%{d}%")
-
-
-    # Filter by actor with OR condition for multiple selections
-    if actor:
-        actors_list = [a.strip() for a in actor.split(",") if a.strip()]
-        if actors_list:
-            actor_conditions = " OR ".join(["a.actor_name LIKE %s"] * len(actors_list))
-            base_query += f"""
-                AND movies.movieId IN (
-                    SELECT ma.movieId FROM movie_actors ma 
-                    JOIN actors a ON ma.actor_id = a.id 
-                    WHERE {actor_conditions}
-                )
-            """
-            for a in actors_list:
-                query_params.append(f"%{a}%")
-    if min_rating:
-        base_query += " AND movies.avg_rating >= %s"
-        query_params.append(float(min_rating))
-    if max_rating:
-        base_query += " AND movies.avg_rating <= %s"
-        query_params.append(float(max_rating))
-
-    # Filter by release date
-    if release_date_from:
-        base_query += " AND movies.release_date >= %s"
-        query_params.append(release_date_from)
-    if release_date_to:
-        base_query += " AND movies.release_date <= %s"
-        query_params.append(release_date_to)
-
-    # Filter by runtime
-    if min_runtime:
-        base_query += " AND CAST(SUBSTRING_INDEX(movies.runtime, ' ', 1) AS UNSIGNED) >= %s"
-        query_params.append(int(min_runtime))
-    if max_runtime:
-        base_query += " AND CAST(SUBSTRING_INDEX(movies.runtime, ' ', 1) AS UNSIGNED) <= %s"
-        query_params.append(int(max_runtime))
-
-    if language:
-        languages_list = [l.strip() for l in language.split(",") if l.strip()]
-        if len(languages_list) == 1:
-            base_query += " AND languages.language_name = %s"
-            query_params.append(languages_list[0])
+    conn = DB_POOL.acquire()
+    completed = False
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT movieId, title, IFNULL(avg_rating, 0) AS avg_rating FROM movies "
+            "WHERE movieId > %s ORDER BY movieId" + (" LIMIT %s" if limit else ""),
+            (after_movie_id, limit) if limit else (after_movie_id,)
+        )
+        yield ""
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                break
+            yield "".join(f"{app.json.dumps(row)}\n" for row in rows)
+        cursor.close()
+        completed = True
+    finally:
+        if completed:
+            DB_POOL.release(conn)
         else:
-            placeholders = ", ".join(["%s"] * len(languages_list))
-            base_query += f" AND languages.language_name IN ({placeholders})"
-            query_params.extend(languages_list)
-
-    # Filter by awards
-    if min_oscars:
-        base_query += " AND awards.oscars_won >= %s"
-        query_params.append(int(min_oscars))
-    if min_golden_globes:
-        base_query += " AND awards.golden_globes_won >= %s"
-        query_params.append(int(min_golden_globes))
-    if min_baftas:
-        base_query += " AND awards.baftas_won >= %s"
-        query_params.append(int(min_baftas))
-
-    # --- Count Query: Get total matching movies ---
-    count_query = "SELECT COUNT(DISTINCT movies.movieId) AS total " + base_query
-    cursor.execute(count_query, tuple(query_params))
-    count_result = cursor.fetchone()
-    total = count_result["total"] if count_result and "total" in count_result else 0
-
-    # --- Main Query: Fetch movie data with pagination ---
-    main_query = """
-        SELECT 
-            movies.movieId, movies.title, 
-            IFNULL(GROUP_CONCAT(DISTINCT genres.genre_name SEPARATOR ', '), 'Unknown') AS genre,
-            IFNULL(movies.avg_rating, 0) AS avg_rating,
-            IFNULL(movies.release_date, 'Unknown') AS release_date,
-            IFNULL(movies.poster_url, '') AS poster_url,
-            IFNULL(GROUP_CONCAT(DISTINCT directors.director_name SEPARATOR ', '), 'Unknown') AS directors,
-            IFNULL(GROUP_CONCAT(DISTINCT actors.actor_name SEPARATOR ', '), 'Unknown') AS actors,
-            IFNULL(movies.runtime, 'Unknown') AS runtime,
-            IFNULL(languages.language_name, 'Unknown') AS language,
-            IFNULL(ratings.imdb_rating, 0) AS imdb_rating,
-            IFNULL(ratings.rotten_tomatoes, 0) AS rt_score,
-            IFNULL(awards.oscars_won, 0) AS oscars,
-            IFNULL(awards.golden_globes_won, 0) AS golden_globes,
-            IFNULL(awards.baftas_won, 0) AS baftas
-    """ + base_query + " GROUP BY movies.movieId LIMIT %s OFFSET %s;"
-    
-    # Copy the filter parameters and add pagination parameters
-    query_params_main = query_params.copy()
-    query_params_main.extend([page_size, offset])
-    
-    cursor.execute(main_query, tuple(query_params_main))
-    movies = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
-    
-    return jsonify({
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "movies": movies
-    })
+            # The client went away mid-stream: dropping the connection is cheaper than draining its unread rows
+            DB_POOL.discard(conn)
 
 @app.route("/movies")
 def get_movies():
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT movieId, title, IFNULL(avg_rating, 0) AS avg_rating FROM movies;")
-    movies = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return jsonify(movies)
+    """All movies; ?after_movieId=&limit= pages by movieId, ?format=ndjson streams them line by line."""
+    stream = request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson"
+    if stream or "after_movieId" in request.args or "limit" in request.args:
+        try:
+            after_movie_id = int(request.args.get("after_movieId", 0))
+            limit = int(request.args["limit"]) if "limit" in request.args else (None if stream else 100)
+        except ValueError:
+            return jsonify({"error": "after_movieId and limit must be integers"}), 400
+        if limit is not None and not 1 <= limit <= MOVIES_PAGE_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {MOVIES_PAGE_LIMIT}"}), 400
+
+        if stream:
+            lines = stream_movies(after_movie_id, limit)
+            next(lines)
+            return app.response_class(lines, mimetype="application/x-ndjson")
+
+        # ✅ Keyset page: one extra row tells whether there is a next page
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("""
+                SELECT movieId, title, IFNULL(avg_rating, 0) AS avg_rating FROM movies
+                WHERE movieId > %s ORDER BY movieId LIMIT %s
+            """, (after_movie_id, limit + 1))
+            movies = cursor.fetchall()
+        has_more = len(movies) > limit
+        movies = movies[:limit]
+        return jsonify({
+            "movies": movies,
+            "limit": limit,
+            "next_after_movieId": movies[-1]["movieId"] if has_more else None
+        })
+
+    def load_movies():
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT movieId, title, IFNULL(avg_rating, 0) AS avg_rating FROM movies;")
+            return cursor.fetchall()
+
+    # avg_rating moves with every rating, so browsers revalidate each time and get a 304 until it changes
+    return cached_json("movies", ["movies"], load_movies, "no-cache")
 
 @app.route("/genres", methods=["GET"])
 def get_genres():
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT DISTINCT genre_name FROM genres ORDER BY genre_name;")
-    genres = [row["genre_name"] for row in cursor.fetchall()]
+    def load_genres():
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT DISTINCT genre_name FROM genres ORDER BY genre_name;")
+            return [row["genre_name"] for row in cursor.fetchall()]
 
-    cursor.close()
-    conn.close()
+    return cached_json("genres", ["genres"], load_genres, f"public, max-age={REFERENCE_MAX_AGE}")
 
-    return jsonify(genres)
 
 
 
+CHARTS = ChartRenderer()
 
 @app.route("/analyze/user_genre_rating_boxplot", methods=["GET"])
 def user_genre_rating_boxplot():
+    """The user's ratings per genre as a PNG box plot drawn from user_genre_stats, or ?format=json for the numbers.
+
+    PNGs are rendered in the chart pool and cached under a digest of the user's statistics rows, so only a change to
+    that user's ratings draws a new one.
+    """
     user_id = request.args.get("userId")
     if not user_id:
         return jsonify({"error": "userId is required"}), 400
@@ -515,181 +348,75 @@ def user_genre_rating_boxplot():
     except ValueError:
         return jsonify({"error": "userId must be an integer"}), 400
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-
     try:
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT r.userId, g.genre_name AS genre, r.rating
-            FROM user_ratings r
-            JOIN movies m ON r.movieId = m.movieId
-            JOIN movie_genres mg ON m.movieId = mg.movieId
-            JOIN genres g ON mg.genreId = g.id
-            WHERE r.userId = %s
-
-        """, (user_id,))
-        data = cursor.fetchall()
-
-        if not data or len(data) == 0:
-            return jsonify({"error": f"No data available for userId {user_id}"}), 200
-
-
-        df = pd.DataFrame(data)
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(data=df, x='genre', y='rating')
-        plt.title(f'Rating Distribution for User {user_id} Across Genres')
-        plt.xlabel('Genre')
-        plt.ylabel('Rating')
-        plt.xticks(rotation=45)
-
-
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        buf.seek(0)
-        image_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-        buf.close()
-        plt.close()
-
-        return jsonify({"image": image_base64})
+        with db_cursor() as (conn, cursor):
+            stats = load_user_stats(cursor, user_id)
+            building = not stats and not stats_are_current(cursor)
     except mysql.connector.Error as err:
         return jsonify({"error": f"Query failed: {err}"}), 500
-    except Exception as err:
-        return jsonify({"error": f"Visualization failed: {err}"}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-
-@app.route("/analyze/filtered_low_ratings", methods=["GET"])
-def filtered_low_ratings():
-    user_id = request.args.get("userId")
-    genre = request.args.get("genre")
-    if not user_id or not genre:
-        return jsonify({"error": "userId and genre are required"}), 400
-
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
 
+    if building:
+        return jsonify({"error": "Genre rating statistics are still being built; see /summary_status"}), 503
+    if not stats:
+        return jsonify({"error": f"No data available for userId {user_id}"}), 404
+    if request.args.get("format") == "json":
+        return jsonify({"userId": user_id, "genres": stats})
+
+    key = ("user_genre_rating_boxplot", user_id, hashlib.sha1(repr(stats).encode("utf-8")).hexdigest())
+    chart = CHARTS.get(key)
+    if chart is None:
+        try:
+            chart = CHARTS.render(key, render_genre_boxplot, user_id, stats)
+        except ChartUnavailable as err:
+            return jsonify({"error": str(err)}), 503
+        except Exception as err:
+            return jsonify({"error": f"Visualization failed: {err}"}), 500
+
+    png, etag = chart
+    response = app.response_class(png, mimetype="image/png")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
+
+
+SUMMARY_INDEXES = {
+    band: SummaryIndex(band, maxsize=int(os.environ.get("SUMMARY_INDEX_USERS", 4096))) for band in SUMMARIES
+}
+
+def filtered_summary(band, keep, description):
+    """Answers a (userId, genre) summary lookup from the in-process index as JSON rows, or ?format=html for a table."""
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT userId, low_rated_genre, other_genre, avg_other_rating, rating_count
-            FROM low_rated_summary
-            WHERE userId = %s AND low_rated_genre = %s AND avg_other_rating <= 3
-            ORDER BY other_genre
-        """, (user_id, genre))
-        data = cursor.fetchall()
-
-        if not data or len(data) == 0:
-            return jsonify({"message": f"No data with avg_other_rating <= 3 for user {user_id} and genre {genre}"}), 200
-
-
-        table_html = """
-        <table border="1" style="border-collapse: collapse; width: 100%;">
-            <thead>
-                <tr>
-                    <th>User ID</th>
-                    <th>Low Rated Genre</th>
-                    <th>Other Genre</th>
-                    <th>Avg Other Rating</th>
-                    <th>Rating Count</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-        for row in data:
-            table_html += f"""
-                <tr>
-                    <td>{row['userId']}</td>
-                    <td>{row['low_rated_genre']}</td>
-                    <td>{row['other_genre']}</td>
-                    <td>{row['avg_other_rating']:.1f}</td>
-                    <td>{row['rating_count']}</td>
-                </tr>
-            """
-        table_html += """
-            </tbody>
-        </table>
-        """
-
-        return jsonify({"table_html": table_html})
-    except mysql.connector.Error as err:
-        return jsonify({"error": f"Query failed: {err}"}), 500
-    except Exception as err:
-        return jsonify({"error": f"Table generation failed: {err}"}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
-
-@app.route("/analyze/filtered_high_ratings", methods=["GET"])
-def filtered_high_ratings():
-    user_id = request.args.get("userId")
-    genre = request.args.get("genre")
-    if not user_id or not genre:
+        user_id = int(request.args.get("userId", ""))
+    except ValueError:
+        user_id = None
+    genre = request.args.get("genre", "").strip()
+    if user_id is None or not genre:
         return jsonify({"error": "userId and genre are required"}), 400
+    if band not in SUMMARY_INDEXES:
+        return jsonify({"error": f"No {band} rating band is configured"}), 404
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
-
+    index = SUMMARY_INDEXES[band]
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT userId, high_rated_genre, other_genre, avg_other_rating, rating_count
-            FROM high_rated_summary
-            WHERE userId = %s AND high_rated_genre = %s AND avg_other_rating >= 4
-            ORDER BY other_genre
-        """, (user_id, genre))
-        data = cursor.fetchall()
-
-        if not data or len(data) == 0:
-            return jsonify({"message": f"No data with avg_other_rating >= 4 for user {user_id} and genre {genre}"}), 200
-
-        table_html = """
-        <table border="1" style="border-collapse: collapse; width: 100%;">
-            <thead>
-                <tr>
-                    <th>User ID</th>
-                    <th>High Rated Genre</th>
-                    <th>Other Genre</th>
-                    <th>Avg Other Rating</th>
-                    <th>Rating Count</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-        for row in data:
-            table_html += f"""
-                <tr>
-                    <td>{row['userId']}</td>
-                    <td>{row['high_rated_genre']}</td>
-                    <td>{row['other_genre']}</td>
-                    <td>{row['avg_other_rating']:.1f}</td>
-                    <td>{row['rating_count']}</td>
-                </tr>
-            """
-        table_html += """
-            </tbody>
-        </table>
-        """
-
-        return jsonify({"table_html": table_html})
+        # Summary rows change when ratings change or the summaries are rebuilt
+        stamp = RESPONSE_CACHE.stamp(("user_ratings", SUMMARY_VERSION))
+        genre, rows = index.lookup(db_cursor, user_id, genre, stamp)
     except mysql.connector.Error as err:
         return jsonify({"error": f"Query failed: {err}"}), 500
-    except Exception as err:
-        return jsonify({"error": f"Table generation failed: {err}"}), 500
-    finally:
-        cursor.close()
-        conn.close()
-
+    rows = [row for row in rows if keep(row["avg_other_rating"])]
 
+    if request.args.get("format") != "html":
+        return jsonify({"userId": user_id, "genre": genre, "rows": rows})
+    if not rows:
+        return jsonify({"message": f"No data with {description} for user {user_id} and genre {genre}"}), 200
+    return jsonify({"table_html": index.render_html(user_id, genre, rows)})
 
+@app.route("/analyze/filtered_low_ratings", methods=["GET"])
+def filtered_low_ratings():
+    return filtered_summary("low", lambda rating: rating <= 3, "avg_other_rating <= 3")
 
+@app.route("/analyze/filtered_high_ratings", methods=["GET"])
+def filtered_high_ratings():
+    return filtered_summary("high", lambda rating: rating >= 4, "avg_other_rating >= 4")
 
 @app.route("/record_genre", methods=["POST"])
 def record_genre():
@@ -699,118 +426,291 @@ def record_genre():
     if not genre:
         return jsonify({"success": False, "message": "Genre is required"}), 400
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"success": False, "message": "Failed to connect to the database"}), 500
-
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM genres WHERE genre_name = %s", (genre,))
-        genre_exists = cursor.fetchone()
+        with db_cursor() as (conn, cursor):
+            cursor.execute("SELECT id FROM genres WHERE genre_name = %s", (genre,))
+            genre_exists = cursor.fetchone()
+    except PoolError:
+        return jsonify({"success": False, "message": "Failed to connect to the database"}), 503
+
+    if not genre_exists:
+        return jsonify({"success": False, "message": "Genre not found in database"}), 404
+
+    return jsonify({"success": True})
 
-        if not genre_exists:
-            return jsonify({"success": False, "message": "Genre not found in database"}), 404
 
-        
-        return jsonify({"success": True})
-    finally:
-        cursor.close()
-        conn.close()
 
 
 
+GENRE_IDS = {}
+GENRE_IDS_LOCK = threading.Lock()
+PREDICTORS = load_predictors()
 
+def get_genre_ids(cursor, refresh=False):
+    """Returns the cached {lowercased genre_name: id} map, loading it on first use or when asked to refresh."""
+    global GENRE_IDS
+    with GENRE_IDS_LOCK:
+        if refresh or not GENRE_IDS:
+            cursor.execute("SELECT id, genre_name FROM genres")
+            GENRE_IDS = {name.lower(): genre_id for genre_id, name in cursor.fetchall()}
+        return GENRE_IDS
+
+def parse_id(value):
+    """An id from JSON: an int, an integral float or a numeric string. Raises TypeError/ValueError for anything else, bools included."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"Not an integer id: {value!r}")
+    return int(value)
+
+def is_genre_list(genres):
+    """True for a non-empty list of non-blank genre names."""
+    return isinstance(genres, list) and bool(genres) and all(isinstance(genre, str) and genre.strip() for genre in genres)
+
+def resolve_genre_names(cursor, genre_lists):
+    """Returns the genre map and the set of requested names it lacks, reloading the map once if needed."""
+    names = {genre for genres in genre_lists for genre in genres}
+    genre_map = get_genre_ids(cursor)
+    if any(genre.lower() not in genre_map for genre in names):
+        genre_map = get_genre_ids(cursor, refresh=True)
+    return genre_map, {genre for genre in names if genre.lower() not in genre_map}
+
+def insert_predicted_movies(cursor, movies):
+    """Adds (movieId, title, signature, genre_ids) candidates to movies and movie_genres with multi-row inserts."""
+    cursor.executemany(
+        "INSERT INTO movies (movieId, title, avg_rating, genre_signature) VALUES (%s, %s, %s, %s)",
+        [(movie_id, f"{title} (2025)", 0, signature) for movie_id, title, signature, _ in movies]
+    )
+    cursor.executemany(
+        "INSERT INTO movie_genres (movieId, genreId) VALUES (%s, %s)",
+        [(movie_id, genre_id) for movie_id, _, _, genre_ids in movies for genre_id in sorted(set(genre_ids))]
+    )
 
 @app.route("/predict_rating", methods=["POST"])
 def predict_rating():
-    data = request.get_json()
+    data = request.get_json() or {}
     movie_id = data.get("movieId")
     title = data.get("title")
     genres = data.get("genres", [])
+    model = data.get("model") or DEFAULT_PREDICTOR
+    user_id = data.get("userId")
 
-    if not movie_id or not title or not genres:
+    if not movie_id or not title or not is_genre_list(genres):
         return jsonify({"error": "Movie ID, title, and genres are required"}), 400
 
+    if model not in PREDICTOR_CLASSES:
+        return jsonify({"error": f"Unknown model '{model}', expected one of: {', '.join(PREDICTOR_CLASSES)}"}), 400
+
     try:
-        movie_id = int(movie_id)
-    except ValueError:
-        return jsonify({"error": "Movie ID must be an integer"}), 400
+        movie_id = parse_id(movie_id)
+        user_id = parse_id(user_id) if user_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Movie ID and user ID must be integers"}), 400
 
-    conn = get_db_connection()
-    if conn is None:
-        return jsonify({"error": "Failed to connect to the database"}), 500
+    # Models that have not been trained yet fall back to the genre baseline
+    predictor = PREDICTORS.get(model, PREDICTORS["genre"])
 
-    try:
-        cursor = conn.cursor()
+    with db_cursor() as (conn, cursor):
+        try:
+            genre_map, missing = resolve_genre_names(cursor, [genres])
+            if missing:
+                return jsonify({"error": f"Genre {sorted(missing)[0]} not found"}), 404
 
-        
-        genre_ids = []
-        for genre in genres:
-            cursor.execute("SELECT id FROM genres WHERE genre_name = %s", (genre,))
-            result = cursor.fetchone()
-            if result:
-                genre_ids.append(result[0])
+            genre_ids = [genre_map[genre.lower()] for genre in genres]
+            signature = genre_signature(genre_ids)
+
+            avg_rating = predictor.predict(cursor, genre_ids, genres, user_id)
+            if avg_rating is None:
+                return jsonify({"error": "No ratings available for movies with these genres"}), 404
+
+            insert_predicted_movies(cursor, [(movie_id, title, signature, genre_ids)])
+            commit_and_bump(conn, cursor, ["movies", "movie_genres"])
+
+            return jsonify({"avg_rating": float(avg_rating), "model": predictor.name})
+        except mysql.connector.Error as err:
+            conn.rollback()
+            return jsonify({"error": f"Database error: {err}"}), 500
+
+MAX_BATCH_PREDICTIONS = int(os.environ.get("MAX_BATCH_PREDICTIONS", 1000))
+
+@app.route("/predict_ratings", methods=["POST"])
+def predict_ratings():
+    """Scores a list of candidate films in one request; candidates sharing a genre set are scored once.
+
+    With "dry_run": true nothing is written, otherwise the scored candidates are added like /predict_rating does.
+    """
+    data = request.get_json() or {}
+    candidates = data.get("candidates")
+    model = data.get("model") or DEFAULT_PREDICTOR
+    user_id = data.get("userId")
+    dry_run = bool(data.get("dry_run", False))
+
+    if not isinstance(candidates, list) or not candidates:
+        return jsonify({"error": "A non-empty list of candidates is required"}), 400
+    if len(candidates) > MAX_BATCH_PREDICTIONS:
+        return jsonify({"error": f"At most {MAX_BATCH_PREDICTIONS} candidates per request"}), 400
+    if model not in PREDICTOR_CLASSES:
+        return jsonify({"error": f"Unknown model '{model}', expected one of: {', '.join(PREDICTOR_CLASSES)}"}), 400
+    try:
+        user_id = parse_id(user_id) if user_id is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "User ID must be an integer"}), 400
+
+    predictor = PREDICTORS.get(model, PREDICTORS["genre"])
+
+    # ✅ Validate every candidate up front; bad ones get an error entry instead of failing the batch
+    results = []
+    valid = []
+    for candidate in candidates:
+        candidate = candidate if isinstance(candidate, dict) else {}
+        result = {"movieId": candidate.get("movieId"), "title": candidate.get("title")}
+        results.append(result)
+        genres = candidate.get("genres")
+        try:
+            movie_id = parse_id(candidate.get("movieId"))
+        except (TypeError, ValueError):
+            result["error"] = "Movie ID must be an integer"
+            continue
+        if not candidate.get("title") or not is_genre_list(genres):
+            result["error"] = "Movie ID, title, and genres are required"
+            continue
+        result["movieId"] = movie_id
+        valid.append((result, movie_id, candidate["title"], genres))
+
+    with db_cursor() as (conn, cursor):
+        try:
+            genre_map, missing = resolve_genre_names(cursor, [genres for _, _, _, genres in valid])
+
+            if not dry_run and valid:
+                movie_ids = sorted({movie_id for _, movie_id, _, _ in valid})
+                placeholders = ", ".join(["%s"] * len(movie_ids))
+                cursor.execute(f"SELECT movieId FROM movies WHERE movieId IN ({placeholders})", movie_ids)
+                taken = {row[0] for row in cursor.fetchall()}
             else:
-                return jsonify({"error": f"Genre {genre} not found"}), 404
-
-        if not genre_ids:
-            return jsonify({"error": "No valid genres provided"}), 400
-
-        
-        genre_count = len(genre_ids)
-        placeholders = ",".join(["%s"] * genre_count)
-        query = f"""
-        SELECT mg.movieId
-        FROM movie_genres mg
-        WHERE mg.genreId IN ({placeholders})
-        GROUP BY mg.movieId
-        HAVING COUNT(DISTINCT mg.genreId) = %s
-        """
-        params = genre_ids + [genre_count]
-        cursor.execute(query, params)
-        matching_movies = [row[0] for row in cursor.fetchall()]
-
-        if not matching_movies:
-            return jsonify({"error": "No movies found with the exact same genres"}), 404
-
-        
-        movie_placeholders = ",".join(["%s"] * len(matching_movies))
-        rating_query = f"""
-        SELECT AVG(r.rating)
-        FROM user_ratings r
-        WHERE r.movieId IN ({movie_placeholders})
-        """
-        cursor.execute(rating_query, matching_movies)
-        avg_rating = cursor.fetchone()[0]
-
-        if avg_rating is None:
-            return jsonify({"error": "No ratings available for matching movies"}), 404
-
-        
+                taken = set()
+
+            # ✅ Group the remaining candidates by genre signature
+            groups = {}
+            scored = []
+            seen_ids = set()
+            for result, movie_id, title, genres in valid:
+                unknown = sorted(genre for genre in genres if genre in missing)
+                if unknown:
+                    result["error"] = f"Genre {unknown[0]} not found"
+                    continue
+                if movie_id in taken or (not dry_run and movie_id in seen_ids):
+                    result["error"] = "Movie ID already exists"
+                    continue
+                seen_ids.add(movie_id)
+                genre_ids = [genre_map[genre.lower()] for genre in genres]
+                signature = genre_signature(genre_ids)
+                groups.setdefault(signature, (genre_ids, genres))
+                scored.append((result, movie_id, title, signature, genre_ids))
+
+            predictions = predictor.predict_many(cursor, groups, user_id)
+
+            new_movies = []
+            for result, movie_id, title, signature, genre_ids in scored:
+                if predictions[signature] is None:
+                    result["error"] = "No ratings available for movies with these genres"
+                    continue
+                result["avg_rating"] = float(predictions[signature])
+                new_movies.append((movie_id, title, signature, genre_ids))
+
+            if not dry_run and new_movies:
+                insert_predicted_movies(cursor, new_movies)
+                commit_and_bump(conn, cursor, ["movies", "movie_genres"])
+
+            return jsonify({
+                "model": predictor.name,
+                "dry_run": dry_run,
+                "signatures": len(groups),
+                "predictions": results
+            })
+        except mysql.connector.Error as err:
+            conn.rollback()
+            return jsonify({"error": f"Database error: {err}"}), 500
+
+RATING_ATTEMPTS = int(os.environ.get("RATING_ATTEMPTS", 3))
+
+def write_user_rating(cursor, user_id, movie_id, rating, timestamp):
+    """Updates the user's rating of the movie, or inserts it if there is none; returns the rating it replaced, or None."""
+    # Locking the existing row first queues concurrent re-ratings of the same pair on it, instead of having each
+    # hold the duplicate-key lock of a failed insert while waiting for the other's
+    cursor.execute(
+        "SELECT id, rating FROM user_ratings WHERE userId = %s AND movieId = %s FOR UPDATE",
+        (user_id, movie_id)
+    )
+    row = cursor.fetchone()
+    if row is None:
         cursor.execute(
-            "INSERT INTO movies (movieId, title, avg_rating) VALUES (%s, %s, %s)",
-            (movie_id, f"{title} (2025)", 0)
+            "INSERT INTO user_ratings (userId, movieId, rating, timestamp) VALUES (%s, %s, %s, %s)",
+            (user_id, movie_id, rating, timestamp)
         )
+        return None
+    rating_id, previous = row
+    cursor.execute(
+        "UPDATE user_ratings SET rating = %s, timestamp = %s WHERE id = %s",
+        (rating, timestamp, rating_id)
+    )
+    return previous
 
-        
-        for genre in genres:
-            cursor.execute(
-                "INSERT INTO movie_genres (movieId, genreId) SELECT %s, id FROM genres WHERE genre_name = %s",
-                (movie_id, genre)
-            )
-
-        conn.commit()
-        
-        
-        
-
-        return jsonify({"avg_rating": float(avg_rating)})
-    except mysql.connector.Error as err:
-        conn.rollback()
-        return jsonify({"error": f"Database error: {err}"}), 500
-    finally:
-        cursor.close()
-        conn.close()
+@app.route("/ratings", methods=["POST"])
+def add_rating():
+    """Records a user's rating for a movie and folds it into that movie's avg_rating."""
+    data = request.get_json() or {}
+    try:
+        user_id = int(data.get("userId"))
+        movie_id = int(data.get("movieId"))
+        rating = float(data.get("rating"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "userId, movieId and a numeric rating are required"}), 400
+    if not 0.5 <= rating <= 5.0:
+        return jsonify({"error": "Rating must be between 0.5 and 5.0"}), 400
+    timestamp = int(data.get("timestamp") or time.time())
+
+    with db_cursor() as (conn, cursor):
+        for attempt in range(1, RATING_ATTEMPTS + 1):
+            try:
+                previous = write_user_rating(cursor, user_id, movie_id, rating, timestamp)
+
+                # A changed rating only moves the sum, by the difference from the rating it replaced; a new one also adds to the count
+                if previous is not None:
+                    apply_rating_deltas(cursor, {movie_id: (rating - previous, 0)})
+                    apply_user_rating_deltas(cursor, {(user_id, movie_id): (rating - previous, 0)})
+                    # Moves one rating from the old value's histogram bucket to the new one's
+                    histogram = {(user_id, movie_id, previous): -1}
+                    histogram[(user_id, movie_id, rating)] = histogram.get((user_id, movie_id, rating), 0) + 1
+                else:
+                    apply_rating_deltas(cursor, {movie_id: (rating, 1)})
+                    apply_user_rating_deltas(cursor, {(user_id, movie_id): (rating, 1)})
+                    histogram = {(user_id, movie_id, rating): 1}
+
+                # ✅ Only this user's summary and genre statistics rows change; if they were current they stay current
+                refresh_user_summaries(cursor, [user_id])
+                apply_histogram_deltas(cursor, histogram)
+                refresh_user_genre_stats(cursor, [user_id])
+                changed = ["user_ratings", "movies"]
+                if summaries_are_current(cursor):
+                    changed.append(SUMMARY_VERSION)
+                if stats_are_current(cursor):
+                    changed.append(GENRE_STATS_VERSION)
+                # Committing and noting the user happen together, so a rebuild's swap and catch-up can't fall between them
+                with RERATED_LOCK:
+                    commit_and_bump(conn, cursor, changed)
+                    for users in RERATED_USERS.values():
+                        users.add(user_id)
+
+                cursor.execute("SELECT avg_rating FROM movies WHERE movieId = %s", (movie_id,))
+                avg_rating = cursor.fetchone()[0]
+                return jsonify({"movieId": movie_id, "avg_rating": avg_rating}), 201
+            except mysql.connector.Error as err:
+                conn.rollback()
+                # 1062: a concurrent first rating of the same pair inserted between our lookup and insert;
+                # 1213: InnoDB picked this transaction as a deadlock victim. Either way it is rerun from the start
+                if err.errno in (1062, 1213) and attempt < RATING_ATTEMPTS:
+                    continue
+                if err.errno == 1452:  # Foreign key violation: unknown movieId
+                    return jsonify({"error": f"Movie {movie_id} not found"}), 404
+                return jsonify({"error": f"Database error: {err}"}), 500
 
 @app.route("/genre-analysis")
 def genre_analysis():
@@ -820,83 +720,32 @@ def genre_analysis():
 @app.route("/personality-analysis")
 def personality_analysis():
     return render_template("personality_traits.html")
-def print_progress(prefix, percent):
-    bar_length = 50  # Length of the progress bar in characters
-    filled_length = int(round(bar_length * percent / 100))
-    bar = '#' * filled_length + '-' * (bar_length - filled_length)
-    # '\r' returns the cursor to the beginning of the line.
-    print(f'\r{prefix}: [{bar}] {percent}% Complete', end='', flush=True)
-
-def background_low_init():
-    print("Initializing low summary...")
-    init_low_rated_summary()
-    print("Initialization completed for low rated summary.")
-
-def background_high_init():  
-    print("Initializing high summary...")  
-    init_high_rated_summary()
-    print("Initialization completed for high rated summary.")
+DIRECTOR_INDEX = NameIndex("directors", "director_name", "movie_directors", "director_id")
+ACTOR_INDEX = NameIndex("actors", "actor_name", "movie_actors", "actor_id")
+
+def autocomplete(index):
+    """Answers a typeahead lookup from the in-process name index; ?rank=films orders by number of films."""
+    if not index.refresh(DB_POOL.connection):
+        return jsonify({"error": "Failed to connect to the database"}), 500
+    return jsonify(index.search(request.args.get("q", ""), rank=request.args.get("rank") == "films"))
+
 @app.route("/search_directors", methods=["GET"])
 def search_directors():
     """Search for directors based on user input."""
-    search_query = request.args.get("q", "").strip().lower()
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if not search_query:
-        cursor.execute("SELECT director_name FROM directors ORDER BY director_name ASC LIMIT 10;")
-    else:
-        cursor.execute("""
-            SELECT director_name FROM directors 
-            WHERE LOWER(director_name) LIKE %s 
-            ORDER BY director_name ASC 
-            LIMIT 10;
-        """, (f"%{search_query}%",))
-
-    directors = [row["director_name"] for row in cursor.fetchall()]
-
-    cursor.close()
-    conn.close()
-
-    return jsonify(directors)
+    return autocomplete(DIRECTOR_INDEX)
 @app.route("/languages", methods=["GET"])
 def get_languages():
     """Fetch all available languages."""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT language_name FROM languages ORDER BY language_name;")
-    languages = [row["language_name"] for row in cursor.fetchall()]
+    def load_languages():
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT language_name FROM languages ORDER BY language_name;")
+            return [row["language_name"] for row in cursor.fetchall()]
 
-
-    cursor.close()
-    conn.close()
-
-    return jsonify(languages)
+    return cached_json("languages", ["languages"], load_languages, f"public, max-age={REFERENCE_MAX_AGE}")
 @app.route("/search_actors", methods=["GET"])
 def search_actors():
     """Search for actors based on user input."""
-    search_query = request.args.get("q", "").strip().lower()
-
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    if not search_query:
-        cursor.execute("SELECT actor_name FROM actors ORDER BY actor_name ASC LIMIT 10;")
-    else:
-        cursor.execute("""
-            SELECT actor_name FROM actors 
-            WHERE LOWER(actor_name) LIKE %s 
-            ORDER BY actor_name ASC 
-            LIMIT 10;
-        """, (f"%{search_query}%",))
-
-    actors = [row["actor_name"] for row in cursor.fetchall()]
-
-    cursor.close()
-    conn.close()
-
-    return jsonify(actors)
+    return autocomplete(ACTOR_INDEX)
 @app.route("/movie_details", methods=["GET"])
 def movie_details():
     """Fetch details for a single movie by title."""
@@ -905,43 +754,10 @@ def movie_details():
     if not title:
         return jsonify({"error": "No title provided"}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    sql_query = """
-        SELECT 
-            movies.title,
-            IFNULL(GROUP_CONCAT(DISTINCT genres.genre_name SEPARATOR ', '), 'Unknown') AS genre,
-            IFNULL(movies.avg_rating, 0) AS avg_rating,
-            IFNULL(movies.release_date, 'Unknown') AS release_date,
-            IFNULL(movies.poster_url, '') AS poster_url,
-            IFNULL(GROUP_CONCAT(DISTINCT directors.director_name SEPARATOR ', '), 'Unknown') AS directors,
-            IFNULL(GROUP_CONCAT(DISTINCT actors.actor_name SEPARATOR ', '), 'Unknown') AS actors,
-            IFNULL(movies.runtime, 'Unknown') AS runtime,
-            IFNULL(languages.language_name, 'Unknown') AS language,
-            IFNULL(ratings.imdb_rating, 0) AS imdb_rating,
-            IFNULL(ratings.rotten_tomatoes, 0) AS rt_score,
-            IFNULL(awards.oscars_won, 0) AS oscars,
-            IFNULL(awards.golden_globes_won, 0) AS golden_globes,
-            IFNULL(awards.baftas_won, 0) AS baftas
-        FROM movies
-        LEFT JOIN movie_genres ON movies.movieId = movie_genres.movieId
-        LEFT JOIN genres ON movie_genres.genreId = genres.id
-        LEFT JOIN movie_directors ON movies.movieId = movie_directors.movieId
-        LEFT JOIN directors ON movie_directors.director_id = directors.id
-        LEFT JOIN movie_actors ON movies.movieId = movie_actors.movieId
-        LEFT JOIN actors ON movie_actors.actor_id = actors.id
-        LEFT JOIN ratings ON movies.movieId = ratings.movieId
-        LEFT JOIN awards ON movies.movieId = awards.movieId
-        LEFT JOIN languages ON movies.language_id = languages.id
-        WHERE movies.title LIKE %s
-        GROUP BY movies.movieId
-    """
-    cursor.execute(sql_query, (f"%{title}%",))
-    movie = cursor.fetchone()
-
-    cursor.close()
-    conn.close()
+    with db_cursor(dictionary=True) as (conn, cursor):
+        movie_id = find_movie_id(cursor, title)
+        movies = hydrate_movies(cursor, [movie_id]) if movie_id is not None else []
+        movie = movies[0] if movies else None
 
     if not movie:
         return jsonify({"error": "Movie not found"}), 404
@@ -961,21 +777,16 @@ def add_movie_to_planner():
     if not list_id or not movie_id or not genre:
         return jsonify({"error": "Missing required fields"}), 400
 
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute(
-            "INSERT INTO planner_list_movies (list_id, movieId, genre) VALUES (%s, %s, %s)",
-            (list_id, movie_id, genre)
-        )
-        conn.commit()
-        return jsonify({"message": "Movie added successfully"}), 201
-    except mysql.connector.Error as err:
-        return jsonify({"error": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    with db_cursor() as (conn, cursor):
+        try:
+            cursor.execute(
+                "INSERT INTO planner_list_movies (list_id, movieId, genre) VALUES (%s, %s, %s)",
+                (list_id, movie_id, genre)
+            )
+            conn.commit()
+            return jsonify({"message": "Movie added successfully"}), 201
+        except mysql.connector.Error as err:
+            return jsonify({"error": str(err)}), 500
 
 @app.route("/planner/lists/<int:list_id>/movies", methods=["GET"])
 def get_movies_in_list(list_id):
@@ -984,23 +795,19 @@ def get_movies_in_list(list_id):
         return jsonify({"error": "User not logged in"}), 401
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute(
-        """
-        SELECT movies.movieId, movies.title, movies.poster_url, planner_list_movies.genre
-        FROM planner_list_movies
-        JOIN movies ON planner_list_movies.movieId = movies.movieId
-        JOIN planner_lists ON planner_list_movies.list_id = planner_lists.id
-        WHERE planner_lists.id = %s AND planner_lists.user_id = %s
-        """,
-        (list_id, user_id),
-    )
-    movies = cursor.fetchall()
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute(
+            """
+            SELECT movies.movieId, movies.title, movies.poster_url, planner_list_movies.genre
+            FROM planner_list_movies
+            JOIN movies ON planner_list_movies.movieId = movies.movieId
+            JOIN planner_lists ON planner_list_movies.list_id = planner_lists.id
+            WHERE planner_lists.id = %s AND planner_lists.user_id = %s
+            """,
+            (list_id, user_id),
+        )
+        movies = cursor.fetchall()
 
-    cursor.close()
-    conn.close()
     return jsonify(movies)
 
 @app.route("/planner/lists/<int:list_id>/movies/<int:movie_id>", methods=["DELETE"])
@@ -1010,19 +817,15 @@ def remove_movie_from_list(list_id, movie_id):
         return jsonify({"error": "User not logged in"}), 401
 
     user_id = session["user_id"]
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_cursor() as (conn, cursor):
+        # Ensure the list belongs to the user
+        cursor.execute("SELECT id FROM planner_lists WHERE id = %s AND user_id = %s", (list_id, user_id))
+        if not cursor.fetchone():
+            return jsonify({"error": "List not found or not authorized"}), 403
 
-    # Ensure the list belongs to the user
-    cursor.execute("SELECT id FROM planner_lists WHERE id = %s AND user_id = %s", (list_id, user_id))
-    if not cursor.fetchone():
-        return jsonify({"error": "List not found or not authorized"}), 403
-
-    cursor.execute("DELETE FROM planner_list_movies WHERE list_id = %s AND movieId = %s", (list_id, movie_id))
-    conn.commit()
+        cursor.execute("DELETE FROM planner_list_movies WHERE list_id = %s AND movieId = %s", (list_id, movie_id))
+        conn.commit()
 
-    cursor.close()
-    conn.close()
     return jsonify({"message": "Movie removed from planner list"}), 200
 @app.route("/signup", methods=["POST"])
 def signup():
@@ -1038,25 +841,20 @@ def signup():
     import bcrypt
     hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(
-            "INSERT INTO users (username, password_hash) VALUES (%s, %s)",
-            (username, hashed_password)
-        )
-        conn.commit()
-        print("User inserted:", username)
-    except mysql.connector.Error as err:
-        print("Database error:", err)
-        if err.errno == 1062:
-            return jsonify({"error": "Username already exists"}), 409
-        else:
-            return jsonify({"error": str(err)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+    with db_cursor() as (conn, cursor):
+        try:
+            cursor.execute(
+                "INSERT INTO users (username, password_hash) VALUES (%s, %s)",
+                (username, hashed_password)
+            )
+            conn.commit()
+            print("User inserted:", username)
+        except mysql.connector.Error as err:
+            print("Database error:", err)
+            if err.errno == 1062:
+                return jsonify({"error": "Username already exists"}), 409
+            else:
+                return jsonify({"error": str(err)}), 500
     
     return jsonify({"message": "Signup successful"}), 201
 
@@ -1066,12 +864,9 @@ def login():
     password = request.form.get("password", "").strip()
     if not username or not password:
         return jsonify({"error": "Username and password required"}), 400
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id, password_hash FROM users WHERE username = %s", (username,))
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
+    with db_cursor(dictionary=True) as (conn, cursor):
+        cursor.execute("SELECT id, password_hash FROM users WHERE username = %s", (username,))
+        user = cursor.fetchone()
     if not user or not bcrypt.checkpw(password.encode("utf-8"), user["password_hash"].encode("utf-8")):
         return jsonify({"error": "Invalid username or password"}), 401
     session["user_id"] = user["id"]
@@ -1084,24 +879,50 @@ def logout():
     return jsonify({"message": "Logged out successfully"}), 200
 @app.route("/import_status", methods=["GET"])
 def import_status():
-    conn = get_db_connection()
-    if conn is None:
+    try:
+        with db_cursor(dictionary=True) as (conn, cursor):
+            cursor.execute("SELECT COUNT(*) as count FROM movies")
+            result = cursor.fetchone()
+    except PoolError:
         return jsonify({"complete": False})
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT COUNT(*) as count FROM movies")
-    result = cursor.fetchone()
-    cursor.close()
-    conn.close()
     # Assuming that if there is at least one movie, the import is complete.
     complete = result and result["count"] > 0
     return jsonify({"complete": complete})
 
+@app.route("/db_pool_stats", methods=["GET"])
+def db_pool_stats():
+    """Connection pool usage: open/in-use/idle connections, waits and wait time, timeouts."""
+    return jsonify(DB_POOL.stats())
+
+@app.route("/summary_status", methods=["GET"])
+def summary_status():
+    """Progress of the background summary and genre statistics builds: state, percent, and rows and elapsed time per step."""
+    return jsonify({"summaries": SUMMARY_PROGRESS.snapshot(), "genre_stats": GENRE_STATS_PROGRESS.snapshot()})
+
+@app.route("/summary_rebuild", methods=["POST"])
+def summary_rebuild():
+    """Starts a full rebuild of user_genre_totals, the summaries and the genre statistics in the background; follow it on /summary_status."""
+    if SUMMARY_REBUILD_LOCK.locked():
+        return jsonify({"error": "A summary build is already running"}), 409
+    threading.Thread(target=background_summary_init, args=(True,), daemon=True).start()
+    return jsonify({"status": "started"}), 202
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    """Size, hit/miss and eviction counters of the /search caches, the per-user summary indexes and rendered charts."""
+    return jsonify({
+        "search_results": SEARCH_RESULTS.stats(),
+        "search_counts": SEARCH_COUNTS.stats(),
+        **{f"summary_index_{band}": index.stats() for band, index in SUMMARY_INDEXES.items()},
+        "charts": CHARTS.stats()
+    })
+
 @app.route("/check_session", methods=["GET"])
 def check_session():
     if "user_id" in session:
         return jsonify({"logged_in": True, "username": session["username"]}), 200
     return jsonify({"logged_in": False}), 200
-threading.Thread(target=background_low_init, daemon=True).start()
-threading.Thread(target=background_high_init, daemon=True).start()
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+
+def start_background_jobs():
+    """Starts the summary and genre statistics builds; server.py calls it in the process that serves requests."""
+    threading.Thread(target=background_summary_init, daemon=True).start()
@@ -0,0 +1,117 @@
+"""In-process autocomplete over the directors and actors tables for /search_directors and /search_actors.
+
+Each NameIndex keeps the names sorted, plus n-gram postings (1 to 3 characters) that point into that order,
+so a query only verifies the names sharing its rarest n-gram and returns them already sorted.
+"""
+import heapq
+import os
+import threading
+import time
+import unicodedata
+from array import array
+from itertools import islice
+
+import mysql.connector
+
+from db_pool import PoolError
+
+REFRESH_SECONDS = float(os.environ.get("AUTOCOMPLETE_REFRESH_SECONDS", 30))
+MAX_GRAM = 3
+
+
+def fold(text):
+    """Lowercases and strips accents, the way MySQL's default *_ai_ci collation compares names."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def grams(key, size):
+    return {key[i:i + size] for i in range(len(key) - size + 1)}
+
+
+class NameIndex:
+    """Substring search over one name table, reloaded when the table or its movie links change."""
+
+    def __init__(self, table, name_column, link_table, link_column):
+        self.table = table
+        self.name_column = name_column
+        self.link_table = link_table
+        self.link_column = link_column
+        self.snapshot = None  # (names, keys, film_counts, postings), swapped as a whole on reload
+        self.signature = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def load(self, cursor):
+        cursor.execute(f"""
+            SELECT n.{self.name_column}, COUNT(l.movieId)
+            FROM {self.table} n
+            LEFT JOIN {self.link_table} l ON l.{self.link_column} = n.id
+            GROUP BY n.id, n.{self.name_column}
+        """)
+        rows = sorted((fold(name), name, films) for name, films in cursor.fetchall())
+        keys = [key for key, _, _ in rows]
+        names = [name for _, name, _ in rows]
+        film_counts = array("I", (films for _, _, films in rows))
+
+        postings = {}
+        for position, key in enumerate(keys):
+            for size in range(1, MAX_GRAM + 1):
+                for gram in grams(key, size):
+                    postings.setdefault(gram, array("I")).append(position)
+
+        self.snapshot = (names, keys, film_counts, postings)
+        print(f"✅ Autocomplete loaded {len(names)} names from {self.table}")
+
+    def current_signature(self, cursor):
+        cursor.execute(f"SELECT COUNT(*), MAX(id), (SELECT COUNT(*) FROM {self.link_table}) FROM {self.table}")
+        return tuple(cursor.fetchone())
+
+    def refresh(self, connection):
+        """Loads the index, or reloads it if the importer changed the tables since the last check.
+
+        The check runs at most every REFRESH_SECONDS, so most lookups never touch MySQL.
+        Returns False only if there is no index yet and it cannot be loaded.
+        """
+        if self.snapshot is not None and time.time() - self.checked_at < REFRESH_SECONDS:
+            return True
+        with self.lock:
+            if self.snapshot is not None and time.time() - self.checked_at < REFRESH_SECONDS:
+                return True
+            try:
+                with connection() as conn:
+                    cursor = conn.cursor()
+                    try:
+                        signature = self.current_signature(cursor)
+                        if self.snapshot is None or signature != self.signature:
+                            self.load(cursor)
+                            self.signature = signature
+                        self.checked_at = time.time()
+                    finally:
+                        cursor.close()
+            except (PoolError, mysql.connector.Error) as err:
+                # Keep serving the last snapshot, and wait a full interval before trying MySQL again
+                print(f"⚠️ Autocomplete could not refresh {self.table}: {err}")
+                self.checked_at = time.time()
+                return self.snapshot is not None
+        return True
+
+    def search(self, query, limit=10, rank=False):
+        """Returns up to limit names containing query, in name order or, with rank, by number of films."""
+        names, keys, film_counts, postings = self.snapshot
+        key = fold(query.strip())
+        if key:
+            size = min(len(key), MAX_GRAM)
+            lists = [postings.get(gram) for gram in grams(key, size)]
+            if any(positions is None for positions in lists):
+                return []
+            candidates = min(lists, key=len)
+        else:
+            candidates = range(len(keys))
+
+        hits = (position for position in candidates if key in keys[position])
+        if rank:
+            best = heapq.nsmallest(limit, hits, key=lambda position: (-film_counts[position], position))
+        else:
+            best = islice(hits, limit)
+        return [names[position] for position in best]
@@ -0,0 +1,121 @@
+"""Compares the sql and pandas summary engines: wall time, memory, and whether they produce the same rows.
+
+    python benchmark_summaries.py                 # both engines against the configured database (rewrites the summaries)
+    python benchmark_summaries.py --source csv    # pandas engine's load and computation, from the MovieLens CSVs
+"""
+import argparse
+import resource
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from build_progress import BuildProgress
+from predictors import MOVIES_CSV, RATINGS_CSV
+from summaries import BUILD_STEPS, SUMMARIES, rebuild_summaries
+from summary_engine import VECTOR_BUILD_STEPS, SummaryArrays, fetch_columns, rebuild_summaries_vectorised
+
+ENGINES = {
+    "sql": (rebuild_summaries, BUILD_STEPS),
+    "pandas": (rebuild_summaries_vectorised, VECTOR_BUILD_STEPS),
+}
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def tmp_table_counters(cursor):
+    """MySQL's session counters of implicit temporary tables, in memory and spilled to disk."""
+    cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN ('Created_tmp_tables', 'Created_tmp_disk_tables')")
+    return {name: int(value) for name, value in cursor.fetchall()}
+
+
+def fingerprint(cursor):
+    """Row count, total rating_count and summed averages per summary table, to check both engines agree."""
+    result = {}
+    for band, summary in SUMMARIES.items():
+        cursor.execute(f"SELECT COUNT(*), IFNULL(SUM(rating_count), 0), ROUND(IFNULL(SUM(avg_other_rating), 0), 2) FROM {summary['table']}")
+        result[band] = tuple(float(value) for value in cursor.fetchone())
+    cursor.execute("SELECT COUNT(*), IFNULL(SUM(rating_count), 0) FROM user_genre_totals")
+    result["totals"] = tuple(float(value) for value in cursor.fetchone())
+    return result
+
+
+def benchmark_db_load(cursor):
+    """Peak Python allocations of the pandas engine's streaming user_ratings load on its own, against the arrays it yields."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    columns = fetch_columns(cursor, "user_ratings", ("userId", "movieId", "rating"), (np.int32, np.int32, np.float32))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"📊 load user_ratings: {len(columns[0])} rows in {elapsed:.2f}s, {peak / 2**20:.1f} MB peak allocations "
+          f"for {sum(column.nbytes for column in columns) / 2**20:.1f} MB of arrays")
+
+
+def benchmark_db(engines):
+    from import_data import connect_db
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    if "pandas" in engines:
+        benchmark_db_load(cursor)
+        conn.commit()
+    fingerprints = {}
+    for engine in engines:
+        build, steps = ENGINES[engine]
+        before = tmp_table_counters(cursor)
+        rss_before = max_rss_mb()
+        tracemalloc.start()
+        started = time.perf_counter()
+        build(conn, BuildProgress(f"{engine} engine", steps))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        after = tmp_table_counters(cursor)
+        fingerprints[engine] = fingerprint(cursor)
+        print(f"📊 {engine}: {elapsed:.2f}s wall, {peak / 2**20:.1f} MB peak Python allocations, "
+              f"max RSS +{max_rss_mb() - rss_before:.1f} MB, "
+              f"MySQL temp tables +{after['Created_tmp_tables'] - before['Created_tmp_tables']} "
+              f"(+{after['Created_tmp_disk_tables'] - before['Created_tmp_disk_tables']} on disk)")
+    cursor.close()
+    conn.close()
+    if len(set(map(str, fingerprints.values()))) > 1:
+        print(f"⚠️ Engines disagree: {fingerprints}")
+    else:
+        print(f"✅ Engines produced the same summaries: {next(iter(fingerprints.values()))}")
+
+
+def benchmark_csv(ratings_csv, movies_csv):
+    # Loading counts towards the peak too, in the same int32/float32 layout the engine streams from MySQL
+    tracemalloc.start()
+    started = time.perf_counter()
+    ratings = pd.read_csv(ratings_csv, usecols=["userId", "movieId", "rating"],
+                          dtype={"userId": np.int32, "movieId": np.int32, "rating": np.float32})
+    movies = pd.read_csv(movies_csv, usecols=["movieId", "genres"])
+    links = movies.assign(genre=movies["genres"].str.split("|")).explode("genre")
+    genre_ids, _ = pd.factorize(links["genre"])
+    arrays = SummaryArrays(ratings["userId"].to_numpy(), ratings["movieId"].to_numpy(), ratings["rating"].to_numpy(),
+                           links["movieId"].to_numpy(), genre_ids)
+    rows = {band: len(arrays.band_rows(summary["contains"])[0]) for band, summary in SUMMARIES.items()}
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"📊 pandas engine on {len(ratings)} ratings: {elapsed:.2f}s, {peak / 2**20:.1f} MB peak allocations, "
+          f"rows {rows}, totals {int(np.count_nonzero(arrays.genre_count))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the rated-genre summary engines.")
+    parser.add_argument("--source", choices=("db", "csv"), default="db")
+    parser.add_argument("--engines", default="sql,pandas", help="comma-separated engines to run against the database")
+    parser.add_argument("--ratings-csv", default=RATINGS_CSV)
+    parser.add_argument("--movies-csv", default=MOVIES_CSV)
+    args = parser.parse_args()
+
+    if args.source == "db":
+        benchmark_db([engine.strip() for engine in args.engines.split(",")])
+    else:
+        benchmark_csv(args.ratings_csv, args.movies_csv)
@@ -0,0 +1,79 @@
+"""Real progress for the background summary builds: every SQL statement or in-process step is timed and its row count recorded.
+
+The app keeps one BuildProgress per summary table and serves their snapshots on /summary_status.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BuildProgress:
+    def __init__(self, name, steps):
+        self.name = name
+        self.steps = list(steps)  # planned step labels, in order, so progress can be reported as a percentage
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.state = "pending"
+        self.message = None
+        self.started_at = None
+        self.finished_at = None
+        self.current_step = None
+        self.current_started_at = None
+        self.completed = []  # {"step", "rows", "elapsed_ms"} per finished statement
+
+    def start(self):
+        with self.lock:
+            self.reset()
+            self.state = "running"
+            self.started_at = time.time()
+        print(f"🔄 {self.name}: building...")
+
+    @contextmanager
+    def step(self, step):
+        """Times one named step of work; the block stores the number of rows it handled in result["rows"]."""
+        with self.lock:
+            self.current_step = step
+            self.current_started_at = time.time()
+        result = {"rows": 0}
+        started = time.perf_counter()
+        yield result
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.completed.append({"step": step, "rows": result["rows"], "elapsed_ms": round(elapsed_ms, 1)})
+            self.current_step = None
+        print(f"⏱️ {self.name}: {step} - {result['rows']} rows in {elapsed_ms / 1000:.2f}s")
+
+    def execute(self, cursor, step, query, params=()):
+        """Runs one statement as a named step, recording the rows it affected and how long it took."""
+        with self.step(step) as result:
+            cursor.execute(query, params)
+            result["rows"] = max(cursor.rowcount, 0)
+        return result["rows"]
+
+    def finish(self, state="done", message=None):
+        """Ends the build as done, skipped or failed."""
+        with self.lock:
+            self.state = state
+            self.message = message
+            self.finished_at = time.time()
+            self.current_step = None
+        icon = {"done": "✅", "skipped": "⏭️"}.get(state, "❌")
+        print(f"{icon} {self.name}: {state}" + (f" ({message})" if message else ""))
+
+    def snapshot(self):
+        with self.lock:
+            now = self.finished_at or time.time()
+            done = len(self.completed)
+            return {
+                "name": self.name,
+                "state": self.state,
+                "message": self.message,
+                "percent": 100 if self.state == "done" else round(100 * done / len(self.steps)) if self.steps else 0,
+                "current_step": self.current_step,
+                "current_step_elapsed_ms": round((time.time() - self.current_started_at) * 1000, 1) if self.current_step else None,
+                "elapsed_ms": round((now - self.started_at) * 1000, 1) if self.started_at else None,
+                "rows_processed": sum(step["rows"] for step in self.completed),
+                "steps": list(self.completed),
+            }
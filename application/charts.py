@@ -0,0 +1,108 @@
+"""Chart rendering for the analysis endpoints, off the request threads.
+
+Each chart is drawn with Matplotlib's object-oriented API on its own Figure, so no pyplot state is shared between
+requests, and runs in a small process pool so a render neither holds the server's GIL nor races another one.
+Rendered PNGs are kept with their ETag under the caller's key (userId plus a digest of the data they were drawn from).
+
+Workers come from a forkserver rather than a fork of the threaded server, so they never inherit a lock another
+thread held. Like spawned processes they re-import the main script as __mp_main__; that is server.py, which does
+nothing on import, so a worker only loads this module and never the app.
+"""
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from matplotlib.figure import Figure
+
+from ttl_cache import TTLCache
+
+CHART_WORKERS = int(os.environ.get("CHART_WORKERS", 2))
+CHART_TIMEOUT = float(os.environ.get("CHART_TIMEOUT", 15))  # seconds a request waits for a slot and for its render
+
+
+class ChartUnavailable(Exception):
+    """Raised when every render slot stays busy, a render does not finish within the timeout, or a worker died."""
+
+
+def render_genre_boxplot(user_id, stats):
+    """PNG of one user's rating distribution per genre, drawn from genre_stats.load_user_stats rows.
+
+    Whiskers span the lowest and highest rating, as only the five-number summary is stored.
+    """
+    figure = Figure(figsize=(12, 6))
+    ax = figure.add_subplot()
+    ax.bxp([
+        {"label": row["genre"], "whislo": row["min"], "q1": row["q1"], "med": row["median"], "q3": row["q3"],
+         "whishi": row["max"], "mean": row["mean"], "fliers": []}
+        for row in stats
+    ])
+    ax.set_title(f"Rating Distribution for User {user_id} Across Genres")
+    ax.set_xlabel("Genre")
+    ax.set_ylabel("Rating")
+    ax.tick_params(axis="x", labelrotation=45)
+    buf = io.BytesIO()
+    figure.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
+
+
+class ChartRenderer:
+    def __init__(self, workers=CHART_WORKERS, timeout=CHART_TIMEOUT, maxsize=256, ttl=3600.0):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)  # key -> (png, etag)
+        self.slots = threading.BoundedSemaphore(workers * 2)  # renders running or queued at once
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def executor(self):
+        # Started on first use; the forkserver preloads this module so each worker starts with Matplotlib imported
+        with self.lock:
+            if self.pool is None:
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["charts"])
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self.pool
+
+    def discard(self, pool):
+        """Drops a broken pool so the next render starts a fresh one."""
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+        pool.shutdown(wait=False)
+
+    def get(self, key):
+        """The cached (png, etag) for key, or None."""
+        return self.cache.get(key)
+
+    def render(self, key, draw, *args):
+        """Draws draw(*args) in a worker process and caches the PNG under key; returns (png, etag)."""
+        if not self.slots.acquire(timeout=self.timeout):
+            raise ChartUnavailable("All chart workers are busy")
+        pool = self.executor()
+        try:
+            future = pool.submit(draw, *args)
+        except BaseException as err:
+            self.slots.release()
+            if isinstance(err, BrokenProcessPool):
+                self.discard(pool)
+                raise ChartUnavailable("Chart workers were restarted; try again") from err
+            raise
+        # The slot is only freed when the render really ends, even if this request stops waiting for it
+        future.add_done_callback(lambda _: self.slots.release())
+        try:
+            png = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise ChartUnavailable(f"Chart took longer than {self.timeout:g}s to render")
+        except BrokenProcessPool as err:
+            self.discard(pool)
+            raise ChartUnavailable("A chart worker died; the workers were restarted") from err
+        entry = (png, hashlib.sha1(png).hexdigest())
+        self.cache.set(key, entry)
+        return entry
+
+    def stats(self):
+        return {**self.cache.stats(), "workers": self.workers}
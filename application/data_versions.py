@@ -0,0 +1,64 @@
+"""Per-table data version counters, used to invalidate in-process caches across the importer and the app.
+
+Writers bump the versions of the tables they change inside their own transaction; readers compare the
+versions a cached value was built from with the current ones.
+"""
+import threading
+import time
+
+
+def bump_versions(cursor, names):
+    """Increments the version of each named table; runs in the caller's transaction, in name order to keep lock order stable."""
+    cursor.executemany("""
+        INSERT INTO data_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1;
+    """, [(name,) for name in sorted(set(names))])
+
+
+def read_versions(cursor):
+    """Returns {table name: version} for every table that has been bumped at least once."""
+    cursor.execute("SELECT name, version FROM data_versions")
+    return {name: version for name, version in cursor.fetchall()}
+
+
+class VersionedCache:
+    """Caches built values per key for as long as the data versions they depend on are unchanged.
+
+    The versions themselves are re-read at most every check_interval seconds, or right after expire().
+    """
+
+    def __init__(self, load_versions, check_interval=2.0):
+        self.load_versions = load_versions
+        self.check_interval = check_interval
+        self.versions = None
+        self.checked_at = 0.0
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def current_versions(self):
+        if self.versions is None or time.time() - self.checked_at >= self.check_interval:
+            with self.lock:
+                if self.versions is None or time.time() - self.checked_at >= self.check_interval:
+                    self.versions = self.load_versions()
+                    self.checked_at = time.time()
+        return self.versions
+
+    def expire(self):
+        """Forces the next lookup to re-read the versions, e.g. right after this process committed a write."""
+        self.checked_at = 0.0
+
+    def stamp(self, depends_on):
+        """The current versions of the tables in depends_on, for keying caches kept elsewhere."""
+        versions = self.current_versions()
+        return tuple(versions.get(name, 0) for name in depends_on)
+
+    def get(self, key, depends_on, build):
+        """Returns the cached value for key, rebuilding it if any table in depends_on has a newer version."""
+        stamp = self.stamp(depends_on)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        # Versions are read before building, so a concurrent write can only make the entry look older than it is
+        value = build()
+        self.entries[key] = (stamp, value)
+        return value
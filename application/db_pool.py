@@ -0,0 +1,142 @@
+"""Thread-safe MySQL connection pool shared by the Flask routes and background jobs.
+
+Connections are created lazily up to `size`, pinged before being handed out, and always come back
+through the `connection()` / `cursor()` context managers, rolled back to a clean state.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+
+
+class PoolError(Exception):
+    """Raised when no healthy connection can be checked out: the database is down or the pool stayed exhausted."""
+
+
+class ConnectionPool:
+    def __init__(self, size=10, acquire_timeout=5.0, **connect_args):
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.connect_args = connect_args
+        self.idle = deque()
+        self.open = 0
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.counters = {
+            "acquired": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "max_wait_ms": 0.0,
+            "timeouts": 0,
+            "health_check_failures": 0,
+            "connect_failures": 0,
+            "discarded": 0,
+        }
+
+    def acquire(self):
+        """Checks a connection out, waiting up to acquire_timeout seconds for one to be returned."""
+        started = time.perf_counter()
+        waited = False
+        with self.condition:
+            while not self.idle and self.open >= self.size:
+                remaining = self.acquire_timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise PoolError(f"No database connection became free within {self.acquire_timeout}s")
+                waited = True
+                self.condition.wait(remaining)
+            conn = self.idle.pop() if self.idle else None
+            if conn is None:
+                self.open += 1  # reserve the slot before connecting outside the lock
+            self.in_use += 1
+            self.counters["acquired"] += 1
+            if waited:
+                wait_ms = (time.perf_counter() - started) * 1000
+                self.counters["waits"] += 1
+                self.counters["wait_time_ms"] += wait_ms
+                self.counters["max_wait_ms"] = max(self.counters["max_wait_ms"], wait_ms)
+
+        # ✅ Health check on checkout: stale connections are replaced transparently
+        if conn is not None and not self.is_healthy(conn):
+            self.close_quietly(conn)
+            conn = None
+            with self.condition:
+                self.counters["health_check_failures"] += 1
+        if conn is None:
+            try:
+                conn = mysql.connector.connect(**self.connect_args)
+            except mysql.connector.Error as err:
+                with self.condition:
+                    self.counters["connect_failures"] += 1
+                    self.open -= 1
+                    self.in_use -= 1
+                    self.condition.notify()
+                raise PoolError(f"Database connection failed: {err}") from err
+        return conn
+
+    def release(self, conn):
+        """Returns a connection, rolling back anything left uncommitted; broken connections are dropped."""
+        healthy = True
+        try:
+            if getattr(conn, "in_transaction", True):
+                conn.rollback()
+        except mysql.connector.Error:
+            healthy = False
+            self.close_quietly(conn)
+        with self.condition:
+            self.in_use -= 1
+            if healthy:
+                self.idle.append(conn)
+            else:
+                self.open -= 1
+            self.condition.notify()
+
+    def discard(self, conn):
+        """Closes a checked-out connection instead of returning it, e.g. when a streamed result was abandoned unread."""
+        self.close_quietly(conn)
+        with self.condition:
+            self.counters["discarded"] += 1
+            self.in_use -= 1
+            self.open -= 1
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    @contextmanager
+    def cursor(self, **cursor_args):
+        """Yields (connection, cursor); the cursor is closed and the connection returned however the block exits."""
+        with self.connection() as conn:
+            cursor = conn.cursor(**cursor_args)
+            try:
+                yield conn, cursor
+            finally:
+                cursor.close()
+
+    def stats(self):
+        with self.condition:
+            stats = dict(self.counters, size=self.size, open=self.open, in_use=self.in_use, idle=len(self.idle))
+        stats["avg_wait_ms"] = stats["wait_time_ms"] / stats["waits"] if stats["waits"] else 0.0
+        return stats
+
+    @staticmethod
+    def is_healthy(conn):
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    @staticmethod
+    def close_quietly(conn):
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
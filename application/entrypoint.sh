@@ -5,4 +5,4 @@ python import_data.py
 echo "📥 Data import complete."
 
 echo "🚀 Starting Flask application..."
-exec python app.py
+exec python server.py
@@ -0,0 +1,196 @@
+"""Per-user, per-genre box plot statistics (count, min, q1, median, q3, max, mean) behind the genre boxplot.
+
+user_genre_rating_histogram counts each user's ratings of each genre per rating value. Ratings take a handful of
+values, so a user has a few rows per genre however many films they rated, and a new rating only adds to one bucket
+per genre of the movie. user_genre_stats is derived from the histogram in SQL, with quartiles interpolated linearly
+between the two nearest sorted ratings as np.percentile (and so Matplotlib's boxplot) computes them.
+
+Like the summaries, a full build fills {table}_next copies and swaps them in with one RENAME TABLE; ratings
+posted meanwhile are caught up afterwards with rebuild_user_genre_stats.
+"""
+import mysql.connector
+
+from data_versions import read_versions
+from summaries import swap_in_shadow_tables
+
+# data_versions entry that matches the user_ratings version while the statistics reflect every rating
+GENRE_STATS_VERSION = "genre_rating_stats"
+GENRE_STATS_TABLES = ["user_genre_rating_histogram", "user_genre_stats"]
+GENRE_STATS_STEPS = ("collect histogram", "aggregate statistics", "swap tables")
+QUARTILES = (("q1", 0.25), ("median", 0.5), ("q3", 0.75))
+
+
+def create_shadow_tables(cursor):
+    """Creates empty _next copies of the histogram and statistics tables (as in init.sql), before any writes."""
+    cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}_next" for table in GENRE_STATS_TABLES))
+    cursor.execute("""
+        CREATE TABLE user_genre_rating_histogram_next (
+            userId INT NOT NULL,
+            genreId INT NOT NULL,
+            rating FLOAT NOT NULL,
+            rating_count INT NOT NULL,
+            PRIMARY KEY (userId, genreId, rating),
+            FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE user_genre_stats_next (
+            userId INT NOT NULL,
+            genreId INT NOT NULL,
+            rating_count INT NOT NULL,
+            rating_min FLOAT NOT NULL,
+            q1 DOUBLE NOT NULL,
+            median DOUBLE NOT NULL,
+            q3 DOUBLE NOT NULL,
+            rating_max FLOAT NOT NULL,
+            mean DOUBLE NOT NULL,
+            PRIMARY KEY (userId, genreId),
+            FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def histogram_query(user_filter="", suffix=""):
+    """The INSERT that counts ratings per user, genre and rating value from user_ratings into the histogram."""
+    return f"""
+        INSERT INTO user_genre_rating_histogram{suffix} (userId, genreId, rating, rating_count)
+        SELECT r.userId, mg.genreId, r.rating, COUNT(*)
+        FROM user_ratings r
+        JOIN movie_genres mg ON mg.movieId = r.movieId
+        {user_filter}
+        GROUP BY r.userId, mg.genreId, r.rating
+    """
+
+
+def stats_query(user_filter="", suffix=""):
+    """The INSERT that fills user_genre_stats from the histogram, optionally for `WHERE userId IN (...)` only.
+
+    suffix="_next" reads and fills the shadow tables.
+    """
+    # For n ratings the quantile at q sits at sorted position q * (n - 1); take the ratings either side of it
+    bounds = ",\n".join(
+        f"MIN(CASE WHEN upto > FLOOR({q} * (n - 1)) THEN rating END) AS {name}_lo, "
+        f"MIN(CASE WHEN upto > CEIL({q} * (n - 1)) THEN rating END) AS {name}_hi"
+        for name, q in QUARTILES
+    )
+    quartiles = ",\n".join(
+        f"{name}_lo + ({q} * (n - 1) - FLOOR({q} * (n - 1))) * ({name}_hi - {name}_lo)"
+        for name, q in QUARTILES
+    )
+    return f"""
+        INSERT INTO user_genre_stats{suffix} (userId, genreId, rating_count, rating_min, q1, median, q3, rating_max, mean)
+        WITH cumulative AS (
+            SELECT userId, genreId, rating, rating_count,
+                   SUM(rating_count) OVER (PARTITION BY userId, genreId ORDER BY rating) AS upto,
+                   SUM(rating_count) OVER (PARTITION BY userId, genreId) AS n
+            FROM user_genre_rating_histogram{suffix}
+            {user_filter}
+        ),
+        positions AS (
+            SELECT userId, genreId, MAX(n) AS n, MIN(rating) AS rating_min, MAX(rating) AS rating_max,
+                   SUM(rating * rating_count) / MAX(n) AS mean,
+                   {bounds}
+            FROM cumulative
+            GROUP BY userId, genreId
+        )
+        SELECT userId, genreId, n, rating_min, {quartiles}, rating_max, mean
+        FROM positions
+    """
+
+
+def stats_are_current(cursor):
+    """True if the statistics were built or kept up to date through the latest change to user_ratings."""
+    versions = read_versions(cursor)
+    return GENRE_STATS_VERSION in versions and versions[GENRE_STATS_VERSION] == versions.get("user_ratings", 0)
+
+
+def mark_stats_built(cursor, ratings_version):
+    """Records that a full rebuild covered user_ratings up to ratings_version (read before the rebuild started)."""
+    cursor.execute("""
+        INSERT INTO data_versions (name, version) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE version = VALUES(version);
+    """, (GENRE_STATS_VERSION, ratings_version))
+
+
+def rebuild_genre_stats(conn, progress):
+    """Full rebuild of the histogram from one grouped pass over user_ratings, and every user's statistics from it.
+
+    user_ratings is read under READ COMMITTED, so it takes no row locks; live reads and POST /ratings only wait
+    for the final RENAME.
+    """
+    cursor = conn.cursor()
+    progress.start()
+    try:
+        create_shadow_tables(cursor)
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        progress.execute(cursor, "collect histogram", histogram_query(suffix="_next"))
+        conn.commit()
+        progress.execute(cursor, "aggregate statistics", stats_query(suffix="_next"))
+        conn.commit()
+        with progress.step("swap tables") as result:
+            swap_in_shadow_tables(cursor, GENRE_STATS_TABLES)
+            result["rows"] = len(GENRE_STATS_TABLES)
+    except mysql.connector.Error as err:
+        conn.rollback()
+        progress.finish("failed", str(err))
+        raise
+    finally:
+        cursor.close()
+    progress.finish()
+
+
+def apply_histogram_deltas(cursor, deltas):
+    """Adds {(userId, movieId, rating): count} deltas to the histogram, once per genre of each movie.
+
+    Runs in the caller's transaction, in key order like apply_user_rating_deltas; buckets that drop to zero are removed.
+    """
+    rows = [(userId, rating, count, movieId) for (userId, movieId, rating), count in sorted(deltas.items()) if count]
+    if not rows:
+        return
+    cursor.executemany("""
+        INSERT INTO user_genre_rating_histogram (userId, genreId, rating, rating_count)
+        SELECT %s, genreId, %s, %s FROM movie_genres WHERE movieId = %s
+        ON DUPLICATE KEY UPDATE rating_count = rating_count + VALUES(rating_count);
+    """, rows)
+    user_ids = sorted({userId for userId, _, _, _ in rows})
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"DELETE FROM user_genre_rating_histogram WHERE userId IN ({placeholders}) AND rating_count <= 0", user_ids)
+
+
+def refresh_user_genre_stats(cursor, user_ids):
+    """Recomputes the statistics of the given users only from their histogram rows, in the caller's transaction."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"DELETE FROM user_genre_stats WHERE userId IN ({placeholders})", user_ids)
+    cursor.execute(stats_query(f"WHERE userId IN ({placeholders})"), user_ids)
+
+
+def rebuild_user_genre_stats(cursor, user_ids):
+    """Recomputes the given users' histogram rows from user_ratings, then their statistics, in the caller's transaction.
+
+    Used after a full rebuild for users whose ratings only reached the tables it replaced.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"DELETE FROM user_genre_rating_histogram WHERE userId IN ({placeholders})", user_ids)
+    cursor.execute(histogram_query(f"WHERE r.userId IN ({placeholders})"), user_ids)
+    refresh_user_genre_stats(cursor, user_ids)
+
+
+def load_user_stats(cursor, user_id):
+    """A user's statistics per genre, by genre name, in the form Matplotlib's Axes.bxp draws."""
+    cursor.execute("""
+        SELECT g.genre_name, s.rating_count, s.rating_min, s.q1, s.median, s.q3, s.rating_max, s.mean
+        FROM user_genre_stats s
+        JOIN genres g ON g.id = s.genreId
+        WHERE s.userId = %s
+        ORDER BY g.genre_name
+    """, (user_id,))
+    return [
+        {"genre": genre, "count": count, "min": low, "q1": q1, "median": median, "q3": q3, "max": high, "mean": mean}
+        for genre, count, low, q1, median, q3, high, mean in cursor.fetchall()
+    ]
@@ -0,0 +1,274 @@
+"""Rating predictors behind /predict_rating.
+
+- genre: mean rating of the movies with exactly the requested genre set (genre_signature_stats).
+- bias:  global mean + user offset + the mean movie offset of the requested genres.
+- mf:    bias model + the dot product of the user's and the genres' mean ALS factors.
+
+The bias and mf models are trained offline into MODEL_DIR and memory-mapped by the Flask app:
+    python predictors.py --source db     # or --source csv to train straight from ml-latest-small
+"""
+import argparse
+import os
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from rating_stats import genre_signature
+
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+DEFAULT_PREDICTOR = os.environ.get("PREDICTOR", "genre")
+RATINGS_CSV = "/dataset/ratings.csv"
+MOVIES_CSV = "/dataset/movies.csv"
+MIN_RATING, MAX_RATING = 0.5, 5.0
+
+
+class Predictor(ABC):
+    name = None
+
+    @abstractmethod
+    def predict(self, cursor, genre_ids, genre_names, user_id=None):
+        """The predicted rating of a movie with these genres (for user_id, if the model knows them), or None."""
+
+    def predict_many(self, cursor, groups, user_id=None):
+        """Scores {signature: (genre_ids, genre_names)} groups, returning {signature: rating or None}."""
+        return {signature: self.predict(cursor, genre_ids, genre_names, user_id) for signature, (genre_ids, genre_names) in groups.items()}
+
+
+class GenreBaselinePredictor(Predictor):
+    """Averages the ratings of movies whose genre set matches the request exactly."""
+    name = "genre"
+
+    def predict(self, cursor, genre_ids, genre_names, user_id=None):
+        signature = genre_signature(genre_ids)
+        return self.predict_many(cursor, {signature: (genre_ids, genre_names)}, user_id)[signature]
+
+    def predict_many(self, cursor, groups, user_id=None):
+        """Resolves every signature's aggregate with one primary-key IN query."""
+        predictions = dict.fromkeys(groups)
+        signatures = sorted(groups)
+        if signatures:
+            placeholders = ", ".join(["%s"] * len(signatures))
+            cursor.execute(
+                f"SELECT signature, rating_sum, rating_count FROM genre_signature_stats WHERE signature IN ({placeholders})",
+                signatures
+            )
+            for signature, rating_sum, rating_count in cursor.fetchall():
+                if rating_count:
+                    predictions[signature] = rating_sum / rating_count
+        return predictions
+
+
+class BiasPredictor(Predictor):
+    """Global mean plus user and movie offsets; an unseen movie takes the mean offset of its genres."""
+    name = "bias"
+    files = ("global_mean", "user_ids", "user_bias", "genre_names", "genre_bias")
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.genre_rows = {str(name).lower(): row for row, name in enumerate(arrays["genre_names"])}
+
+    def user_row(self, user_id):
+        """Returns the user's row in the trained arrays, or None for users the model has not seen."""
+        if user_id is None:
+            return None
+        user_ids = self.arrays["user_ids"]
+        row = int(np.searchsorted(user_ids, user_id))
+        return row if row < len(user_ids) and user_ids[row] == user_id else None
+
+    def genre_indexes(self, genre_names):
+        return np.array(sorted({self.genre_rows[name.lower()] for name in genre_names if name.lower() in self.genre_rows}), dtype=np.int64)
+
+    def predict(self, cursor, genre_ids, genre_names, user_id=None):
+        genres = self.genre_indexes(genre_names)
+        if not len(genres):
+            return None
+        return float(np.clip(self.score(genres, self.user_row(user_id)), MIN_RATING, MAX_RATING))
+
+    def score(self, genres, user):
+        prediction = float(self.arrays["global_mean"][0]) + float(self.arrays["genre_bias"][genres].mean())
+        if user is not None:
+            prediction += float(self.arrays["user_bias"][user])
+        return prediction
+
+
+class MatrixFactorizationPredictor(BiasPredictor):
+    """Bias model plus the user's ALS factors dotted with the mean factors of the requested genres."""
+    name = "mf"
+    files = BiasPredictor.files + ("user_factors", "genre_factors")
+
+    def score(self, genres, user):
+        prediction = super().score(genres, user)
+        if user is not None:
+            prediction += float(self.arrays["user_factors"][user] @ self.arrays["genre_factors"][genres].mean(axis=0))
+        return prediction
+
+
+PREDICTOR_CLASSES = {cls.name: cls for cls in (GenreBaselinePredictor, BiasPredictor, MatrixFactorizationPredictor)}
+
+
+def load_predictors(model_dir=MODEL_DIR):
+    """Returns {name: predictor}; trained models are memory-mapped and skipped if their arrays are missing."""
+    predictors = {GenreBaselinePredictor.name: GenreBaselinePredictor()}
+    for cls in (BiasPredictor, MatrixFactorizationPredictor):
+        paths = {name: os.path.join(model_dir, f"{name}.npy") for name in cls.files}
+        if not all(os.path.exists(path) for path in paths.values()):
+            print(f"⚠️ No trained '{cls.name}' model in {model_dir}; requests for it use the genre baseline.")
+            continue
+        predictors[cls.name] = cls({name: np.load(path, mmap_mode="r") for name, path in paths.items()})
+        print(f"✅ Loaded '{cls.name}' rating model from {model_dir}")
+    return predictors
+
+
+# ---------------------------------------------------------------------------
+# Offline training
+# ---------------------------------------------------------------------------
+
+def load_training_data_from_db():
+    """Reads (userId, movieId, rating) arrays and (movieId, genre_name) pairs from the database.
+
+    The ratings are streamed into int32/float32 arrays like the summary engine's loader, never held as one list of tuples.
+    """
+    from import_data import connect_db
+    from summary_engine import fetch_columns
+
+    conn = connect_db()
+    cursor = conn.cursor()
+    users, movies, ratings = fetch_columns(
+        cursor, "user_ratings", ["userId", "movieId", "rating"], [np.int32, np.int32, np.float32]
+    )
+    cursor.execute("SELECT mg.movieId, g.genre_name FROM movie_genres mg JOIN genres g ON g.id = mg.genreId")
+    movie_genres = cursor.fetchall()
+    cursor.close()
+    conn.close()
+    return users, movies, ratings, movie_genres
+
+
+def load_training_data_from_csv(ratings_csv=RATINGS_CSV, movies_csv=MOVIES_CSV):
+    """Reads the same arrays straight from the MovieLens CSVs."""
+    import pandas as pd
+
+    ratings = pd.read_csv(ratings_csv, usecols=["userId", "movieId", "rating"])
+    movies = pd.read_csv(movies_csv, usecols=["movieId", "genres"])
+    movie_genres = [
+        (movieId, genre.strip())
+        for movieId, genres in movies.itertuples(index=False)
+        for genre in str(genres).split("|") if genre.strip()
+    ]
+    return (ratings["userId"].to_numpy(np.int64), ratings["movieId"].to_numpy(np.int64),
+            ratings["rating"].to_numpy(np.float64), movie_genres)
+
+
+def fit_biases(user_index, item_index, ratings, n_users, n_items, reg, iterations):
+    """Fits regularised user and movie offsets around the global mean by alternating closed-form updates."""
+    global_mean = ratings.mean(dtype=np.float64)
+    user_bias = np.zeros(n_users)
+    item_bias = np.zeros(n_items)
+    user_counts = np.bincount(user_index, minlength=n_users)
+    item_counts = np.bincount(item_index, minlength=n_items)
+    for _ in range(iterations):
+        item_bias = np.bincount(item_index, weights=ratings - global_mean - user_bias[user_index], minlength=n_items) / (item_counts + reg)
+        user_bias = np.bincount(user_index, weights=ratings - global_mean - item_bias[item_index], minlength=n_users) / (user_counts + reg)
+    return global_mean, user_bias, item_bias
+
+
+def group_rows(index, size):
+    """Returns (order, bounds) so that order[bounds[i]:bounds[i + 1]] are the ratings belonging to row i."""
+    order = np.argsort(index, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(index, minlength=size))))
+    return order, bounds
+
+
+def solve_factors(target, fixed, groups, other_index, residuals, reg):
+    """One ALS half-step: solves each row of target against the fixed factors of the rows it rated."""
+    order, bounds = groups
+    eye = np.eye(target.shape[1])
+    for row in range(target.shape[0]):
+        ratings = order[bounds[row]:bounds[row + 1]]
+        if not len(ratings):
+            continue
+        factors = fixed[other_index[ratings]]
+        target[row] = np.linalg.solve(factors.T @ factors + reg * len(ratings) * eye, factors.T @ residuals[ratings])
+
+
+def fit_als(user_index, item_index, residuals, n_users, n_items, factors, reg, iterations, seed):
+    """Factorises the bias residuals with alternating least squares."""
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(0, 0.1, (n_users, factors))
+    item_factors = rng.normal(0, 0.1, (n_items, factors))
+    by_user = group_rows(user_index, n_users)
+    by_item = group_rows(item_index, n_items)
+    for iteration in range(iterations):
+        solve_factors(user_factors, item_factors, by_user, item_index, residuals, reg)
+        solve_factors(item_factors, user_factors, by_item, user_index, residuals, reg)
+        error = residuals - np.einsum("ij,ij->i", user_factors[user_index], item_factors[item_index])
+        print(f"🔁 ALS iteration {iteration + 1}/{iterations}: train RMSE {np.sqrt(np.mean(error ** 2)):.4f}")
+    return user_factors, item_factors
+
+
+def genre_means(movie_ids, item_bias, item_factors, movie_genres):
+    """Averages the trained movie offsets and factors per genre, used to score movies the model has never seen."""
+    names = np.array(sorted({genre for _, genre in movie_genres}))
+    movie_column = np.array([movieId for movieId, _ in movie_genres], dtype=np.int64)
+    genre_column = np.searchsorted(names, [genre for _, genre in movie_genres])
+
+    rows = np.minimum(np.searchsorted(movie_ids, movie_column), len(movie_ids) - 1)
+    rated = movie_ids[rows] == movie_column
+    rows, genre_column = rows[rated], genre_column[rated]
+
+    counts = np.bincount(genre_column, minlength=len(names))
+    keep = counts > 0
+    bias = np.bincount(genre_column, weights=item_bias[rows], minlength=len(names))
+    factors = np.zeros((len(names), item_factors.shape[1]))
+    np.add.at(factors, genre_column, item_factors[rows])
+    return names[keep], bias[keep] / counts[keep], factors[keep] / counts[keep][:, None]
+
+
+def train(users, movies, ratings, movie_genres, factors=20, iterations=10, bias_reg=10.0, factor_reg=0.1, seed=42):
+    """Trains the bias and ALS models and returns the arrays both predictors serve from."""
+    user_ids, user_index = np.unique(users, return_inverse=True)
+    movie_ids, item_index = np.unique(movies, return_inverse=True)
+    print(f"📊 Training on {len(ratings)} ratings from {len(user_ids)} users and {len(movie_ids)} movies...")
+
+    global_mean, user_bias, item_bias = fit_biases(user_index, item_index, ratings, len(user_ids), len(movie_ids), bias_reg, iterations)
+    residuals = ratings - global_mean - user_bias[user_index] - item_bias[item_index]
+    print(f"🔁 Bias model: train RMSE {np.sqrt(np.mean(residuals ** 2)):.4f}")
+
+    user_factors, item_factors = fit_als(user_index, item_index, residuals, len(user_ids), len(movie_ids), factors, factor_reg, iterations, seed)
+    genre_names, genre_bias, genre_factors = genre_means(movie_ids, item_bias, item_factors, movie_genres)
+
+    return {
+        "global_mean": np.array([global_mean]),
+        "user_ids": user_ids,
+        "user_bias": user_bias,
+        "user_factors": user_factors,
+        "movie_ids": movie_ids,
+        "item_bias": item_bias,
+        "item_factors": item_factors,
+        "genre_names": genre_names,
+        "genre_bias": genre_bias,
+        "genre_factors": genre_factors,
+    }
+
+
+def save_arrays(arrays, model_dir=MODEL_DIR):
+    os.makedirs(model_dir, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(os.path.join(model_dir, f"{name}.npy"), np.ascontiguousarray(array))
+    print(f"💾 Saved {len(arrays)} model arrays to {model_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the bias and matrix-factorisation rating models.")
+    parser.add_argument("--source", choices=("db", "csv"), default="db", help="read ratings from the database or the MovieLens CSVs")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--factors", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--bias-reg", type=float, default=10.0)
+    parser.add_argument("--factor-reg", type=float, default=0.1)
+    args = parser.parse_args()
+
+    started = time.time()
+    data = load_training_data_from_db() if args.source == "db" else load_training_data_from_csv()
+    save_arrays(train(*data, factors=args.factors, iterations=args.iterations, bias_reg=args.bias_reg, factor_reg=args.factor_reg), args.model_dir)
+    print(f"✅ Training finished in {time.time() - started:.1f}s")
@@ -0,0 +1,99 @@
+def genre_signature(genre_ids):
+    """Returns the canonical key of a genre set: its sorted ids joined by commas, matching GROUP_CONCAT(... ORDER BY genreId)."""
+    return ",".join(str(genre_id) for genre_id in sorted(set(genre_ids)))
+
+
+def aggregate_ratings(ratings):
+    """Sums (movieId, rating) pairs into {movieId: (rating_sum, rating_count)} deltas."""
+    deltas = {}
+    for movieId, rating in ratings:
+        rating_sum, rating_count = deltas.get(int(movieId), (0.0, 0))
+        deltas[int(movieId)] = (rating_sum + float(rating), rating_count + 1)
+    return deltas
+
+
+def apply_rating_deltas(cursor, deltas):
+    """Adds {movieId: (rating_sum, rating_count)} deltas to movie_rating_stats and genre_signature_stats, and refreshes those movies' avg_rating.
+
+    Runs in the caller's transaction. Rows are written in key order so concurrent importers lock them consistently.
+    """
+    if not deltas:
+        return
+    movie_ids = sorted(deltas)
+    cursor.executemany("""
+        INSERT INTO movie_rating_stats (movieId, rating_sum, rating_count)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE rating_sum = rating_sum + VALUES(rating_sum), rating_count = rating_count + VALUES(rating_count);
+    """, [(movieId, deltas[movieId][0], deltas[movieId][1]) for movieId in movie_ids])
+
+    placeholders = ", ".join(["%s"] * len(movie_ids))
+    cursor.execute(f"""
+        UPDATE movies m
+        JOIN movie_rating_stats s ON s.movieId = m.movieId
+        SET m.avg_rating = s.rating_sum / s.rating_count
+        WHERE m.movieId IN ({placeholders}) AND s.rating_count > 0;
+    """, movie_ids)
+
+    # ✅ Roll the same deltas up by each movie's exact genre set
+    cursor.execute(f"SELECT movieId, genre_signature FROM movies WHERE movieId IN ({placeholders}) AND genre_signature IS NOT NULL;", movie_ids)
+    signature_deltas = {}
+    for movieId, signature in cursor.fetchall():
+        rating_sum, rating_count = signature_deltas.get(signature, (0.0, 0))
+        signature_deltas[signature] = (rating_sum + deltas[movieId][0], rating_count + deltas[movieId][1])
+    if signature_deltas:
+        cursor.executemany("""
+            INSERT INTO genre_signature_stats (signature, rating_sum, rating_count)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE rating_sum = rating_sum + VALUES(rating_sum), rating_count = rating_count + VALUES(rating_count);
+        """, [(signature, *signature_deltas[signature]) for signature in sorted(signature_deltas)])
+
+
+def refresh_genre_signatures(cursor, movie_ids=None):
+    """Recomputes movies.genre_signature from movie_genres for the given movies, or for every movie."""
+    movie_filter, params = "", []
+    if movie_ids is not None:
+        if not movie_ids:
+            return
+        movie_filter = "WHERE movieId IN ({})".format(", ".join(["%s"] * len(movie_ids)))
+        params = list(movie_ids)
+    cursor.execute(f"""
+        UPDATE movies m
+        JOIN (
+            SELECT movieId, GROUP_CONCAT(genreId ORDER BY genreId SEPARATOR ',') AS signature
+            FROM movie_genres
+            {movie_filter}
+            GROUP BY movieId
+        ) g ON g.movieId = m.movieId
+        SET m.genre_signature = g.signature;
+    """, params)
+
+
+def rebuild_rating_stats(cursor):
+    """Recomputes movie_rating_stats, movies.avg_rating and genre_signature_stats from user_ratings in one grouped pass."""
+    cursor.execute("DELETE FROM movie_rating_stats;")
+    cursor.execute("""
+        INSERT INTO movie_rating_stats (movieId, rating_sum, rating_count)
+        SELECT movieId, SUM(rating), COUNT(*)
+        FROM user_ratings
+        GROUP BY movieId;
+    """)
+    rebuilt = cursor.rowcount
+
+    # Movies nobody has rated keep the avg_rating they were imported with
+    cursor.execute("""
+        UPDATE movies m
+        JOIN movie_rating_stats s ON s.movieId = m.movieId
+        SET m.avg_rating = s.rating_sum / s.rating_count;
+    """)
+
+    refresh_genre_signatures(cursor)
+    cursor.execute("DELETE FROM genre_signature_stats;")
+    cursor.execute("""
+        INSERT INTO genre_signature_stats (signature, rating_sum, rating_count)
+        SELECT m.genre_signature, SUM(s.rating_sum), SUM(s.rating_count)
+        FROM movie_rating_stats s
+        JOIN movies m ON m.movieId = s.movieId
+        WHERE m.genre_signature IS NOT NULL
+        GROUP BY m.genre_signature;
+    """)
+    return rebuilt
@@ -0,0 +1,339 @@
+"""Two-phase movie search used by /search and /movie_details.
+
+Phase one filters and pages on movie ids using only the movies table's indexed columns and id subqueries.
+Phase two hydrates just that page: one row query plus one query each for genres, directors and actors.
+Title text goes through the ngram FULLTEXT index ft_movies_title.
+Pages continue from an opaque cursor holding the last row's sort key (keyset pagination), so deep pages cost the same as the first.
+"""
+import base64
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+NGRAM_TOKEN_SIZE = int(os.environ.get("NGRAM_TOKEN_SIZE", 2))
+
+SEARCH_FIELDS = {
+    "q": "query",
+    "min_rating": "min_rating",
+    "max_rating": "max_rating",
+    "releaseDateFrom": "release_date_from",
+    "releaseDateTo": "release_date_to",
+    "min_runtime": "min_runtime",
+    "max_runtime": "max_runtime",
+    "minOscars": "min_oscars",
+    "minGoldenGlobes": "min_golden_globes",
+    "minBAFTAs": "min_baftas",
+}
+LIST_FIELDS = ("genres", "director", "actor", "language")
+NUMERIC_FIELDS = {
+    "min_rating": float,
+    "max_rating": float,
+    "min_runtime": int,
+    "max_runtime": int,
+    "min_oscars": int,
+    "min_golden_globes": int,
+    "min_baftas": int,
+}
+# Every numeric filter is a plain range on an indexed movies column
+RANGE_CONDITIONS = {
+    "min_rating": "movies.avg_rating >= %s",
+    "max_rating": "movies.avg_rating <= %s",
+    "release_date_from": "movies.release_date >= %s",
+    "release_date_to": "movies.release_date <= %s",
+    "min_runtime": "movies.runtime_minutes >= %s",
+    "max_runtime": "movies.runtime_minutes <= %s",
+    "min_oscars": "movies.oscars_won >= %s",
+    "min_golden_globes": "movies.golden_globes_won >= %s",
+    "min_baftas": "movies.baftas_won >= %s",
+}
+
+
+def title_phrase(text):
+    """Returns the BOOLEAN MODE term for a title search, or None when no word is long enough to have an ngram.
+
+    Words shorter than NGRAM_TOKEN_SIZE ("A", "I", "2") have no ngram in the index and are left to the LIKE check.
+    If every word is long enough the whole text is one phrase; otherwise each remaining word is a required term.
+    """
+    words = text.replace('"', " ").split()
+    indexed = [word for word in words if len(word) >= NGRAM_TOKEN_SIZE]
+    if not indexed:
+        return None
+    if len(indexed) == len(words):
+        return '"{}"'.format(" ".join(words))
+    return " ".join(f'+"{word}"' for word in indexed)
+
+
+def title_match(text):
+    """Returns a (condition, params) pair matching titles that contain text.
+
+    The FULLTEXT term narrows the candidates through the index; the LIKE then checks the exact substring on those rows only.
+    Plain LIKE is only used when no word of the text is long enough for the index.
+    """
+    phrase = title_phrase(text)
+    if phrase is None:
+        return "movies.title LIKE %s", [f"%{text}%"]
+    return "MATCH(movies.title) AGAINST (%s IN BOOLEAN MODE) AND movies.title LIKE %s", [phrase, f"%{text}%"]
+
+
+def relevance_expression(filters):
+    """Returns the (expression, params) of the title relevance sort key, or None when not searching by text.
+
+    Relevance is cast to DECIMAL so the value handed back in a cursor compares exactly equal to the one MySQL sorted on.
+    """
+    phrase = title_phrase(filters["query"]) if "query" in filters else None
+    if phrase is None:
+        return None
+    return "CAST(MATCH(movies.title) AGAINST (%s IN BOOLEAN MODE) AS DECIMAL(20, 8))", [phrase]
+
+
+def relevance_order(filters):
+    """Returns the ORDER BY clause and parameters: best title matches first when searching by text, then movieId."""
+    relevance = relevance_expression(filters)
+    if relevance is None:
+        return "movies.movieId", []
+    return relevance[0] + " DESC, movies.movieId", relevance[1]
+
+
+def seek_condition(filters, after):
+    """Returns the (condition, params) selecting rows that sort after the key `after` in relevance_order."""
+    relevance = relevance_expression(filters)
+    if relevance is None:
+        return "movies.movieId > %s", [after[-1]]
+    expression, params = relevance
+    relevance_value, movie_id = after
+    return (
+        f"({expression} < %s OR ({expression} = %s AND movies.movieId > %s))",
+        params + [relevance_value] + params + [relevance_value, movie_id]
+    )
+
+
+def canonical_filters(filters):
+    """Normalises filters that select the same movies to the same form: sorted, de-duplicated, case-folded lists and plain numbers.
+
+    Name and genre matching is case-insensitive in MySQL, so folding case here never merges different result sets.
+    """
+    canonical = {}
+    for name, value in filters.items():
+        if isinstance(value, list):
+            value = sorted({item.casefold() for item in value})
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        canonical[name] = value
+    return canonical
+
+
+def filter_signature(filters):
+    """A short stable hash of the canonical filters, used to key cached results and counts and to bind cursors."""
+    return hashlib.sha1(json.dumps(canonical_filters(filters), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(key, signature):
+    """Packs a sort key and the filter signature it belongs to into a URL-safe token."""
+    payload = json.dumps({"f": signature, "k": [str(value) if isinstance(value, Decimal) else value for value in key]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, filters):
+    """Returns the sort key in a cursor token; raises ValueError if it is malformed or was issued for other filters."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        signature, key = payload["f"], payload["k"]
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Malformed cursor")
+    if signature != filter_signature(filters):
+        raise ValueError("Cursor does not match the search filters")
+    expected = 2 if relevance_expression(filters) is not None else 1
+    if not isinstance(key, list) or len(key) != expected or not isinstance(key[-1], int):
+        raise ValueError("Malformed cursor")
+    if expected == 2:
+        try:
+            key[0] = Decimal(key[0])
+        except (ArithmeticError, TypeError):
+            raise ValueError("Malformed cursor")
+    return key
+
+
+def parse_search_filters(args):
+    """Reads the /search query string into a dict of active filters; raises ValueError on bad numbers."""
+    filters = {}
+    for arg, name in SEARCH_FIELDS.items():
+        value = args.get(arg, "").strip()
+        if value:
+            filters[name] = NUMERIC_FIELDS[name](value) if name in NUMERIC_FIELDS else value
+    for name in LIST_FIELDS:
+        values = [value.strip() for value in args.get(name, "").split(",") if value.strip()]
+        if values:
+            filters[name] = values
+    return filters
+
+
+def build_filter_query(filters, after=None):
+    """Returns the FROM/WHERE clause and parameters for the filters; every condition is sargable on movies.
+
+    With `after`, only rows sorting after that key are kept.
+    """
+    conditions = []
+    params = []
+
+    if "query" in filters:
+        condition, condition_params = title_match(filters["query"])
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    if "genres" in filters:
+        conditions.append("""movies.movieId IN (
+            SELECT mg.movieId FROM movie_genres mg
+            JOIN genres g ON mg.genreId = g.id
+            WHERE g.genre_name IN ({})
+        )""".format(", ".join(["%s"] * len(filters["genres"]))))
+        params.extend(filters["genres"])
+
+    # Directors and actors match any of the comma-separated names
+    if "director" in filters:
+        conditions.append("""movies.movieId IN (
+            SELECT md.movieId FROM movie_directors md
+            JOIN directors d ON md.director_id = d.id
+            WHERE {}
+        )""".format(" OR ".join(["d.director_name LIKE %s"] * len(filters["director"]))))
+        params.extend(f"%{name}%" for name in filters["director"])
+
+    if "actor" in filters:
+        conditions.append("""movies.movieId IN (
+            SELECT ma.movieId FROM movie_actors ma
+            JOIN actors a ON ma.actor_id = a.id
+            WHERE {}
+        )""".format(" OR ".join(["a.actor_name LIKE %s"] * len(filters["actor"]))))
+        params.extend(f"%{name}%" for name in filters["actor"])
+
+    for name, condition in RANGE_CONDITIONS.items():
+        if name in filters:
+            conditions.append(condition)
+            params.append(filters[name])
+
+    # Language names resolve to ids first, so the filter is a lookup on idx_movies_language
+    if "language" in filters:
+        conditions.append("movies.language_id IN (SELECT id FROM languages WHERE language_name IN ({}))".format(
+            ", ".join(["%s"] * len(filters["language"]))))
+        params.extend(filters["language"])
+
+    if after is not None:
+        condition, condition_params = seek_condition(filters, after)
+        conditions.append(condition)
+        params.extend(condition_params)
+
+    clause = "FROM movies"
+    if conditions:
+        clause += " WHERE " + " AND ".join(conditions)
+    return clause, params
+
+
+def count_movies(cursor, filters):
+    clause, params = build_filter_query(filters)
+    cursor.execute("SELECT COUNT(*) AS total " + clause, tuple(params))
+    row = cursor.fetchone()
+    return row["total"] if row else 0
+
+
+def search_movie_ids(cursor, filters, limit, offset=0, after=None):
+    """Phase one: the ids of one page of matching movies, by title relevance and then movieId.
+
+    Pages start after the sort key `after` when given (or skip `offset` rows, for random access to numbered pages).
+    Returns (movie_ids, next_key), where next_key is the last row's sort key, or None on the last page.
+    """
+    clause, params = build_filter_query(filters, after)
+    order, order_params = relevance_order(filters)
+    relevance = relevance_expression(filters)
+    select = "SELECT movies.movieId"
+    select_params = []
+    if relevance is not None:
+        select += f", {relevance[0]} AS relevance"
+        select_params = relevance[1]
+    # One extra row tells whether there is a next page without counting
+    cursor.execute(
+        select + " " + clause + " ORDER BY " + order + " LIMIT %s OFFSET %s",
+        tuple(select_params + params + order_params) + (limit + 1, offset)
+    )
+    rows = cursor.fetchall()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_key = [last["relevance"], last["movieId"]] if relevance is not None else [last["movieId"]]
+    return [row["movieId"] for row in rows], next_key
+
+
+def find_movie_id(cursor, title):
+    """Returns the id of the best title match: an exact title first, then the most relevant, then the lowest movieId."""
+    condition, params = title_match(title)
+    order, order_params = relevance_order({"query": title})
+    cursor.execute(
+        f"SELECT movies.movieId FROM movies WHERE {condition} ORDER BY movies.title = %s DESC, {order} LIMIT 1",
+        tuple(params + [title] + order_params)
+    )
+    row = cursor.fetchone()
+    return row["movieId"] if row else None
+
+
+def fetch_names(cursor, query, movie_ids):
+    """Runs a (movieId, name) query for the page and returns {movieId: "name, name"} with names sorted and unique."""
+    names = {}
+    cursor.execute(query.format(", ".join(["%s"] * len(movie_ids))), tuple(movie_ids))
+    for row in cursor.fetchall():
+        movie_names = names.setdefault(row["movieId"], [])
+        if row["name"] not in movie_names:
+            movie_names.append(row["name"])
+    return {movieId: ", ".join(movie_names) for movieId, movie_names in names.items()}
+
+
+def hydrate_movies(cursor, movie_ids):
+    """Phase two: full result rows for the given ids, returned in the same order."""
+    if not movie_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(movie_ids))
+    cursor.execute(f"""
+        SELECT
+            movies.movieId, movies.title,
+            IFNULL(movies.avg_rating, 0) AS avg_rating,
+            IFNULL(movies.release_date, 'Unknown') AS release_date,
+            IFNULL(movies.poster_url, '') AS poster_url,
+            IFNULL(movies.runtime, 'Unknown') AS runtime,
+            IFNULL(languages.language_name, 'Unknown') AS language,
+            IFNULL(ratings.imdb_rating, 0) AS imdb_rating,
+            IFNULL(ratings.rotten_tomatoes, 0) AS rt_score,
+            movies.oscars_won AS oscars,
+            movies.golden_globes_won AS golden_globes,
+            movies.baftas_won AS baftas
+        FROM movies
+        LEFT JOIN languages ON movies.language_id = languages.id
+        LEFT JOIN ratings ON movies.movieId = ratings.movieId
+        WHERE movies.movieId IN ({placeholders})
+    """, tuple(movie_ids))
+    rows = {row["movieId"]: row for row in cursor.fetchall()}
+
+    genres = fetch_names(cursor, """
+        SELECT mg.movieId, g.genre_name AS name FROM movie_genres mg
+        JOIN genres g ON mg.genreId = g.id
+        WHERE mg.movieId IN ({}) ORDER BY g.genre_name
+    """, movie_ids)
+    directors = fetch_names(cursor, """
+        SELECT md.movieId, d.director_name AS name FROM movie_directors md
+        JOIN directors d ON md.director_id = d.id
+        WHERE md.movieId IN ({}) ORDER BY d.director_name
+    """, movie_ids)
+    actors = fetch_names(cursor, """
+        SELECT ma.movieId, a.actor_name AS name FROM movie_actors ma
+        JOIN actors a ON ma.actor_id = a.id
+        WHERE ma.movieId IN ({}) ORDER BY a.actor_name
+    """, movie_ids)
+
+    movies = []
+    for movieId in movie_ids:
+        if movieId not in rows:
+            continue
+        movie = rows[movieId]
+        movie["genre"] = genres.get(movieId, "Unknown")
+        movie["directors"] = directors.get(movieId, "Unknown")
+        movie["actors"] = actors.get(movieId, "Unknown")
+        movies.append(movie)
+    return movies
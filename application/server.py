@@ -0,0 +1,16 @@
+"""Starts the Flask app: `python server.py` (entrypoint.sh).
+
+Chart workers (charts.py) re-import the main script as __mp_main__, so everything happens under the __main__ guard:
+a worker imports nothing from the app. With debug=True the Werkzeug reloader runs this script twice, as a file watcher
+and as the server it restarts (WERKZEUG_RUN_MAIN=true); only the server starts the background builds.
+"""
+import os
+
+DEBUG = True
+
+if __name__ == "__main__":
+    from app import app, start_background_jobs
+
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_jobs()
+    app.run(host="0.0.0.0", port=5000, debug=DEBUG)
@@ -0,0 +1,287 @@
+"""Rated-genre summaries (low_rated_summary, high_rated_summary, ...) behind /analyze/filtered_*_ratings.
+
+Each rating band (low: < 3.0, high: > 4.0 by default) has its own summary table. For each user and each genre of
+a movie they rated inside the band, a row holds the average and count of that user's ratings of every other
+movie, per genre of those movies.
+
+For a user with per-genre totals S[g], C[g] (user_genre_totals) and picked movies m with genre sets G(m), the
+row for (genre A, genre g) is
+    count = sum over picked m with A in G(m) of  C[g] - (ratings of m if g in G(m) else 0)
+    sum   = sum over picked m with A in G(m) of  S[g] - (rating sum of m if g in G(m) else 0)
+so nothing joins back to user_ratings. A full build makes one grouped pass over user_ratings into
+user_movie_ratings, tagging each (user, movie) with the bands it falls in, and derives the totals and every
+band from it. A new or changed rating only recomputes the rows of the user who made it.
+
+Full builds fill {table}_next copies and swap them in with one RENAME TABLE, so the live tables are only locked
+for the swap; ratings posted meanwhile are caught up afterwards with rebuild_user_summaries.
+"""
+import os
+import re
+
+import mysql.connector
+
+from data_versions import read_versions
+
+MIN_RATINGS = 5  # summary rows need more than this many ratings behind them
+# "sql" builds inside MySQL; "pandas" computes in-process with summary_engine.py and bulk-writes the rows
+SUMMARY_ENGINE = os.environ.get("SUMMARY_ENGINE", "sql")
+
+# data_versions entry that matches the user_ratings version while the summaries reflect every rating
+SUMMARY_VERSION = "rating_summaries"
+
+
+def parse_bands(spec):
+    """Parses a band list such as "low:<3.0,high:>4.0,mid:3.0-4.0" into {name: band}.
+
+    "<x" and ">x" are strict bounds, "a-b" is inclusive. Each band gets a {name}_rated_summary table.
+    """
+    bands = {}
+    for entry in spec.split(","):
+        name, _, bounds = entry.strip().partition(":")
+        if not re.fullmatch(r"[a-z][a-z0-9_]*", name) or name in bands:
+            raise ValueError(f"Bad summary band name: {name!r}")
+        if bounds.startswith("<"):
+            low, high = None, float(bounds[1:])
+            condition = f"rating < {high}"
+            contains = lambda ratings, high=high: ratings < high
+        elif bounds.startswith(">"):
+            low, high = float(bounds[1:]), None
+            condition = f"rating > {low}"
+            contains = lambda ratings, low=low: ratings > low
+        else:
+            low, _, high = bounds.partition("-")
+            low, high = float(low), float(high)
+            condition = f"rating BETWEEN {low} AND {high}"
+            contains = lambda ratings, low=low, high=high: (ratings >= low) & (ratings <= high)
+        bands[name] = {
+            "table": f"{name}_rated_summary",
+            "genre_column": f"{name}_rated_genre",
+            "condition": condition,  # true for a rating row inside the band
+            "contains": contains,  # the same test over a NumPy array of ratings
+            "bit": 1 << len(bands),  # the band's flag in user_movie_ratings.bands
+        }
+    return bands
+
+
+SUMMARIES = parse_bands(os.environ.get("SUMMARY_BANDS", "low:<3.0,high:>4.0"))
+
+BUILD_STEPS = ("collect user movies", "aggregate totals") + tuple(
+    f"aggregate {band} summary" for band in SUMMARIES
+) + ("swap tables",)
+
+
+def summary_tables():
+    """Every table a full build replaces: user_genre_totals and each band's summary."""
+    return ["user_genre_totals"] + [summary["table"] for summary in SUMMARIES.values()]
+
+
+def create_summary_table(cursor, band, table=None):
+    summary = SUMMARIES[band]
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table or summary["table"]} (
+            userId INT,
+            {summary["genre_column"]} VARCHAR(255),
+            other_genre VARCHAR(255),
+            avg_other_rating FLOAT,
+            rating_count INT,
+            PRIMARY KEY (userId, {summary["genre_column"]}, other_genre)
+        )
+    """)
+
+
+def create_totals_table(cursor, table):
+    """user_genre_totals' layout (as in init.sql) under another name, for a rebuild's shadow copy."""
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            userId INT NOT NULL,
+            genreId INT NOT NULL,
+            rating_sum DOUBLE NOT NULL DEFAULT 0,
+            rating_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (userId, genreId),
+            FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+        )
+    """)
+
+
+def create_shadow_tables(cursor):
+    """Creates empty {table}_next copies of every table a full build replaces. DDL commits, so call it before any writes."""
+    cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}_next" for table in summary_tables()))
+    create_totals_table(cursor, "user_genre_totals_next")
+    for band, summary in SUMMARIES.items():
+        create_summary_table(cursor, band)
+        create_summary_table(cursor, band, f"{summary['table']}_next")
+
+
+def swap_in_shadow_tables(cursor, tables=None):
+    """Atomically replaces the live tables (by default summary_tables()) with their filled _next copies, then drops the old ones."""
+    tables = tables or summary_tables()
+    cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}_old" for table in tables))
+    # RENAME TABLE also renames the generated foreign key names (user_genre_totals_next_ibfk_1 -> user_genre_totals_ibfk_1)
+    cursor.execute("RENAME TABLE " + ", ".join(f"{table} TO {table}_old, {table}_next TO {table}" for table in tables))
+    cursor.execute("DROP TABLE " + ", ".join(f"{table}_old" for table in tables))
+
+
+def summaries_are_current(cursor):
+    """True if the summaries were built or kept up to date through the latest change to user_ratings."""
+    versions = read_versions(cursor)
+    return SUMMARY_VERSION in versions and versions[SUMMARY_VERSION] == versions.get("user_ratings", 0)
+
+
+def mark_summaries_built(cursor, ratings_version):
+    """Records that a full rebuild covered user_ratings up to ratings_version (read before the rebuild started)."""
+    cursor.execute("""
+        INSERT INTO data_versions (name, version) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE version = VALUES(version);
+    """, (SUMMARY_VERSION, ratings_version))
+
+
+def band_rows_query(band, picked, suffix=""):
+    """Returns the INSERT that fills a band's summary from the `picked` CTE: (userId, movieId, movie_sum, movie_count)
+    for every movie the user rated inside the band, plus user_genre_totals; suffix="_next" targets the shadow tables."""
+    summary = SUMMARIES[band]
+    return f"""
+        INSERT INTO {summary["table"]}{suffix} (userId, {summary["genre_column"]}, other_genre, avg_other_rating, rating_count)
+        WITH picked AS ({picked}),
+        picked_genres AS (
+            SELECT p.userId, p.movieId, p.movie_sum, p.movie_count, mg.genreId
+            FROM picked p
+            JOIN movie_genres mg ON mg.movieId = p.movieId
+        ),
+        anchors AS (
+            SELECT userId, genreId, COUNT(*) AS movies
+            FROM picked_genres
+            GROUP BY userId, genreId
+        ),
+        overlaps AS (
+            SELECT a.userId, a.genreId AS anchor_genre, o.genreId AS other_genre,
+                   SUM(a.movie_sum) AS excluded_sum, SUM(a.movie_count) AS excluded_count
+            FROM picked_genres a
+            JOIN picked_genres o ON o.userId = a.userId AND o.movieId = a.movieId
+            GROUP BY a.userId, a.genreId, o.genreId
+        ),
+        combined AS (
+            SELECT an.userId, an.genreId AS anchor_genre, t.genreId AS other_genre,
+                   an.movies * t.rating_sum - IFNULL(ov.excluded_sum, 0) AS rating_sum,
+                   an.movies * t.rating_count - IFNULL(ov.excluded_count, 0) AS rating_count
+            FROM anchors an
+            JOIN user_genre_totals{suffix} t ON t.userId = an.userId
+            LEFT JOIN overlaps ov
+                ON ov.userId = an.userId AND ov.anchor_genre = an.genreId AND ov.other_genre = t.genreId
+        )
+        SELECT c.userId, ga.genre_name, go.genre_name, c.rating_sum / c.rating_count, c.rating_count
+        FROM combined c
+        JOIN genres ga ON ga.id = c.anchor_genre
+        JOIN genres go ON go.id = c.other_genre
+        WHERE c.rating_count > {MIN_RATINGS}
+    """
+
+
+def rebuild_summaries(conn, progress):
+    """Full rebuild of user_genre_totals and every band's summary from a single pass over user_ratings.
+
+    user_ratings is read once, under READ COMMITTED so it takes no row locks, and committed on its own; the
+    rest is built in the _next tables, so live reads and POST /ratings only wait for the final RENAME.
+    """
+    band_flags = " | ".join(f"(MAX({band['condition']}) * {band['bit']})" for band in SUMMARIES.values())
+    cursor = conn.cursor()
+    progress.start()
+    try:
+        create_shadow_tables(cursor)
+        # A regular table rather than a TEMPORARY one: the band queries read it twice, which MySQL refuses for temporary tables
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_movie_ratings (
+                userId INT NOT NULL,
+                movieId INT NOT NULL,
+                movie_sum DOUBLE NOT NULL,
+                movie_count INT NOT NULL,
+                bands INT NOT NULL,
+                PRIMARY KEY (userId, movieId)
+            )
+        """)
+        cursor.execute("TRUNCATE TABLE user_movie_ratings")
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        progress.execute(cursor, "collect user movies", f"""
+            INSERT INTO user_movie_ratings (userId, movieId, movie_sum, movie_count, bands)
+            SELECT userId, movieId, SUM(rating), COUNT(*), {band_flags}
+            FROM user_ratings
+            GROUP BY userId, movieId
+        """)
+        conn.commit()
+
+        progress.execute(cursor, "aggregate totals", """
+            INSERT INTO user_genre_totals_next (userId, genreId, rating_sum, rating_count)
+            SELECT u.userId, mg.genreId, SUM(u.movie_sum), SUM(u.movie_count)
+            FROM user_movie_ratings u
+            JOIN movie_genres mg ON mg.movieId = u.movieId
+            GROUP BY u.userId, mg.genreId
+        """)
+        for band, summary in SUMMARIES.items():
+            progress.execute(cursor, f"aggregate {band} summary", band_rows_query(band, f"""
+                SELECT userId, movieId, movie_sum, movie_count
+                FROM user_movie_ratings
+                WHERE bands & {summary["bit"]}
+            """, "_next"))
+        conn.commit()
+        with progress.step("swap tables") as result:
+            swap_in_shadow_tables(cursor)
+            result["rows"] = len(summary_tables())
+        cursor.execute("TRUNCATE TABLE user_movie_ratings")
+    except mysql.connector.Error as err:
+        conn.rollback()
+        progress.finish("failed", str(err))
+        raise
+    finally:
+        cursor.close()
+    progress.finish()
+
+
+def apply_user_rating_deltas(cursor, deltas):
+    """Adds {(userId, movieId): (rating_sum, rating_count)} deltas to user_genre_totals, once per genre of each movie.
+
+    Runs in the caller's transaction, in key order like apply_rating_deltas.
+    """
+    rows = [(userId, rating_sum, rating_count, movieId) for (userId, movieId), (rating_sum, rating_count) in sorted(deltas.items())]
+    if rows:
+        cursor.executemany("""
+            INSERT INTO user_genre_totals (userId, genreId, rating_sum, rating_count)
+            SELECT %s, genreId, %s, %s FROM movie_genres WHERE movieId = %s
+            ON DUPLICATE KEY UPDATE rating_sum = rating_sum + VALUES(rating_sum), rating_count = rating_count + VALUES(rating_count);
+        """, rows)
+
+
+def refresh_user_summaries(cursor, user_ids):
+    """Recomputes every band's summary rows for the given users only, in the caller's transaction."""
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    for band, summary in SUMMARIES.items():
+        cursor.execute(f"DELETE FROM {summary['table']} WHERE userId IN ({placeholders})", user_ids)
+        cursor.execute(band_rows_query(band, f"""
+            SELECT userId, movieId, SUM(rating) AS movie_sum, COUNT(*) AS movie_count
+            FROM user_ratings
+            WHERE userId IN ({placeholders})
+            GROUP BY userId, movieId
+            HAVING MAX({summary["condition"]})
+        """), user_ids)
+
+
+def rebuild_user_summaries(cursor, user_ids):
+    """Recomputes the given users' user_genre_totals from user_ratings, then their summary rows, in the caller's transaction.
+
+    Used after a full build's swap for users who rated while it ran, whose incremental updates went to the replaced tables.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(f"DELETE FROM user_genre_totals WHERE userId IN ({placeholders})", user_ids)
+    cursor.execute(f"""
+        INSERT INTO user_genre_totals (userId, genreId, rating_sum, rating_count)
+        SELECT r.userId, mg.genreId, SUM(r.rating), COUNT(*)
+        FROM user_ratings r
+        JOIN movie_genres mg ON mg.movieId = r.movieId
+        WHERE r.userId IN ({placeholders})
+        GROUP BY r.userId, mg.genreId
+    """, user_ids)
+    refresh_user_summaries(cursor, user_ids)
@@ -0,0 +1,199 @@
+"""Vectorised in-process engine for the rated-genre summaries, selected with SUMMARY_ENGINE=pandas.
+
+user_ratings and movie_genres are streamed once into compact int32/float32 arrays; per-user genre sum/count
+matrices and every band's rows come from grouped bincounts over them, using the same algebra as
+summaries.band_rows_query, and are bulk-written back. Users are processed in blocks so the (user, genre, genre) matrices stay small.
+"""
+import numpy as np
+import pandas as pd
+import mysql.connector
+
+from summaries import MIN_RATINGS, SUMMARIES, create_shadow_tables, summary_tables, swap_in_shadow_tables
+
+WRITE_BATCH_SIZE = 10000
+FETCH_BATCH_SIZE = 50000
+BLOCK_CELLS = 4_000_000  # user block size is chosen so block * genres * genres stays under this
+
+VECTOR_BUILD_STEPS = ("load ratings", "load genres", "aggregate totals", "write totals") + tuple(
+    step for band in SUMMARIES for step in (f"aggregate {band} summary", f"write {band} summary")
+) + ("swap tables",)
+
+
+def expand_genres(rows_movie, genre_offsets, genre_counts, genres):
+    """For rows pointing at movies, returns (row index, genre) with one entry per genre of each row's movie."""
+    repeats = genre_counts[rows_movie]
+    row_index = np.repeat(np.arange(len(rows_movie)), repeats)
+    first = np.cumsum(repeats) - repeats
+    positions = np.repeat(genre_offsets[rows_movie], repeats) + np.arange(repeats.sum()) - np.repeat(first, repeats)
+    return row_index, genres[positions]
+
+
+class SummaryArrays:
+    """Ratings collapsed to one row per (user, movie), plus each movie's genres in CSR form."""
+
+    def __init__(self, user_ids, movie_ids, ratings, genre_movie_ids, genre_ids):
+        user_codes, self.users = pd.factorize(np.asarray(user_ids, dtype=np.int64), sort=True)
+        movie_codes, movies = pd.factorize(np.asarray(movie_ids, dtype=np.int64), sort=True)
+        ratings = np.asarray(ratings, dtype=np.float64)
+        n_movies = max(len(movies), 1)
+
+        # One row per (user, movie): rating sum and count, and which ratings fall in each band
+        pair_keys, self.pair_index = np.unique(user_codes.astype(np.int64) * n_movies + movie_codes, return_inverse=True)
+        self.pair_user = (pair_keys // n_movies).astype(np.int32)
+        self.pair_movie = (pair_keys % n_movies).astype(np.int32)
+        self.pair_sum = np.bincount(self.pair_index, weights=ratings, minlength=len(pair_keys))
+        self.pair_count = np.bincount(self.pair_index, minlength=len(pair_keys)).astype(np.float64)
+        self.ratings = ratings
+
+        # movie_genres for the rated movies, grouped by movie
+        links = pd.DataFrame({"movie": pd.Index(movies).get_indexer(np.asarray(genre_movie_ids, dtype=np.int64)),
+                              "genre": np.asarray(genre_ids, dtype=np.int64)})
+        links = links[links["movie"] >= 0].drop_duplicates().sort_values(["movie", "genre"])
+        genre_codes, self.genres = pd.factorize(links["genre"].to_numpy(), sort=True)
+        self.link_genres = genre_codes.astype(np.int32)
+        self.genre_counts = np.bincount(links["movie"].to_numpy(), minlength=n_movies)
+        self.genre_offsets = np.cumsum(self.genre_counts) - self.genre_counts
+        self.n_users = len(self.users)
+        self.n_genres = len(self.genres)
+
+        rows, genres = self.expand(np.arange(len(pair_keys)))
+        cells = self.pair_user[rows].astype(np.int64) * self.n_genres + genres
+        size = self.n_users * self.n_genres
+        self.genre_sum = np.bincount(cells, weights=self.pair_sum[rows], minlength=size).reshape(self.n_users, self.n_genres)
+        self.genre_count = np.bincount(cells, weights=self.pair_count[rows], minlength=size).reshape(self.n_users, self.n_genres)
+
+    def expand(self, pair_rows):
+        index, genres = expand_genres(self.pair_movie[pair_rows], self.genre_offsets, self.genre_counts, self.link_genres)
+        return pair_rows[index], genres
+
+    def totals(self):
+        """user_genre_totals rows as arrays: (userId, genreId, rating_sum, rating_count)."""
+        users, genres = np.nonzero(self.genre_count)
+        return self.users[users], self.genres[genres], self.genre_sum[users, genres], self.genre_count[users, genres]
+
+    def band_rows(self, contains, min_ratings=MIN_RATINGS):
+        """One band's summary rows as arrays: (userId, anchor genreId, other genreId, average, count)."""
+        picked = np.flatnonzero(np.bincount(self.pair_index, weights=contains(self.ratings), minlength=len(self.pair_user)) > 0)
+        # (picked movie, anchor genre) and then (picked movie, anchor genre, other genre) within the same movie
+        anchor_rows, anchor_genres = self.expand(picked)
+        overlap_index, other_genres = expand_genres(
+            self.pair_movie[anchor_rows], self.genre_offsets, self.genre_counts, self.link_genres
+        )
+        overlap_rows = anchor_rows[overlap_index]
+        overlap_anchors = anchor_genres[overlap_index]
+
+        genres = self.n_genres
+        block = max(1, BLOCK_CELLS // (genres * genres))
+        anchor_users = self.pair_user[anchor_rows]
+        overlap_users = self.pair_user[overlap_rows]
+        parts = []
+        for start in range(0, self.n_users, block):
+            stop = min(start + block, self.n_users)
+            size = stop - start
+            # Pair rows are sorted by user, so each block is a contiguous slice
+            a0, a1 = np.searchsorted(anchor_users, [start, stop])
+            o0, o1 = np.searchsorted(overlap_users, [start, stop])
+            anchors = np.bincount(
+                (anchor_users[a0:a1] - start).astype(np.int64) * genres + anchor_genres[a0:a1], minlength=size * genres
+            ).reshape(size, genres)
+            cells = ((overlap_users[o0:o1] - start).astype(np.int64) * genres + overlap_anchors[o0:o1]) * genres + other_genres[o0:o1]
+            rows = overlap_rows[o0:o1]
+            excluded_sum = np.bincount(cells, weights=self.pair_sum[rows], minlength=size * genres * genres).reshape(size, genres, genres)
+            excluded_count = np.bincount(cells, weights=self.pair_count[rows], minlength=size * genres * genres).reshape(size, genres, genres)
+
+            counts = anchors[:, :, None] * self.genre_count[start:stop, None, :] - excluded_count
+            sums = anchors[:, :, None] * self.genre_sum[start:stop, None, :] - excluded_sum
+            users, anchor, other = np.nonzero((anchors[:, :, None] > 0) & (counts > min_ratings))
+            parts.append((users + start, anchor, other, sums[users, anchor, other] / counts[users, anchor, other],
+                          np.rint(counts[users, anchor, other]).astype(np.int64)))
+
+        if not parts:
+            return tuple(np.array([], dtype=dtype) for dtype in (np.int64, np.int64, np.int64, np.float64, np.int64))
+        users, anchor, other, averages, counts = (np.concatenate(column) for column in zip(*parts))
+        return self.users[users], self.genres[anchor], self.genres[other], averages, counts
+
+
+def fetch_columns(cursor, table, columns, dtypes):
+    """Streams columns of a table with fetchmany into preallocated NumPy arrays of the given dtypes.
+
+    Only FETCH_BATCH_SIZE rows exist as Python tuples at a time. COUNT(*) and the SELECT read the same
+    snapshot inside the caller's transaction, so the arrays are sized exactly.
+    """
+    cursor.execute(f"SELECT COUNT(*) FROM {table}")
+    size = cursor.fetchone()[0]
+    arrays = [np.empty(size, dtype=dtype) for dtype in dtypes]
+    cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+    filled = 0
+    while True:
+        rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+        if not rows:
+            break
+        if filled + len(rows) > size:  # only without a consistent snapshot: grow rather than fail
+            size = max(2 * size, filled + len(rows))
+            arrays = [np.resize(array, size) for array in arrays]
+        for array, values in zip(arrays, zip(*rows)):
+            array[filled:filled + len(rows)] = values
+        filled += len(rows)
+    return [array[:filled] for array in arrays]
+
+
+def write_rows(cursor, query, columns):
+    """Bulk-inserts column arrays in batches; mysql-connector turns each executemany into multi-row INSERTs."""
+    rows = list(zip(*(column.tolist() for column in columns)))
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        cursor.executemany(query, rows[start:start + WRITE_BATCH_SIZE])
+    return len(rows)
+
+
+def rebuild_summaries_vectorised(conn, progress):
+    """Full rebuild of user_genre_totals and every band's summary, computed in-process and written to the _next tables.
+
+    The rows are committed there and swapped in with one RENAME, like summaries.rebuild_summaries.
+    """
+    cursor = conn.cursor()
+    progress.start()
+    try:
+        # DDL commits implicitly, so the shadow tables are created before any rows are written
+        create_shadow_tables(cursor)
+        with progress.step("load ratings") as result:
+            # user_ratings.rating is a FLOAT column, so float32 holds its values exactly
+            user_ids, movie_ids, ratings = fetch_columns(
+                cursor, "user_ratings", ("userId", "movieId", "rating"), (np.int32, np.int32, np.float32)
+            )
+            result["rows"] = len(ratings)
+        with progress.step("load genres") as result:
+            link_movies, link_genres = fetch_columns(cursor, "movie_genres", ("movieId", "genreId"), (np.int32, np.int32))
+            cursor.execute("SELECT id, genre_name FROM genres")
+            genre_names = dict(cursor.fetchall())
+            result["rows"] = len(link_movies)
+        conn.commit()  # ends the read snapshot; the rows are written in a transaction of their own
+
+        with progress.step("aggregate totals") as result:
+            arrays = SummaryArrays(user_ids, movie_ids, ratings, link_movies, link_genres)
+            totals = arrays.totals()
+            result["rows"] = len(totals[0])
+        with progress.step("write totals") as result:
+            result["rows"] = write_rows(cursor, """
+                INSERT INTO user_genre_totals_next (userId, genreId, rating_sum, rating_count) VALUES (%s, %s, %s, %s)
+            """, (totals[0], totals[1], totals[2], totals[3].astype(np.int64)))
+
+        for band, summary in SUMMARIES.items():
+            with progress.step(f"aggregate {band} summary") as result:
+                users, anchors, others, averages, counts = arrays.band_rows(summary["contains"])
+                result["rows"] = len(users)
+            with progress.step(f"write {band} summary") as result:
+                result["rows"] = write_rows(cursor, f"""
+                    INSERT INTO {summary["table"]}_next (userId, {summary["genre_column"]}, other_genre, avg_other_rating, rating_count)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (users, pd.Series(anchors).map(genre_names).to_numpy(), pd.Series(others).map(genre_names).to_numpy(), averages, counts))
+        conn.commit()
+        with progress.step("swap tables") as result:
+            swap_in_shadow_tables(cursor)
+            result["rows"] = len(summary_tables())
+    except mysql.connector.Error as err:
+        conn.rollback()
+        progress.finish("failed", str(err))
+        raise
+    finally:
+        cursor.close()
+    progress.finish()
@@ -0,0 +1,71 @@
+"""In-process per-user index over the rated-genre summary tables, behind /analyze/filtered_*_ratings.
+
+Each band's index maps userId -> genre -> rows sorted by other genre. A user is loaded on first request with one
+primary-key range query and kept in an LRU; entries are keyed on the data versions they were read at, so a
+summary rebuild or a new rating makes the next request reload them.
+"""
+from html import escape
+
+from summaries import SUMMARIES
+from ttl_cache import TTLCache
+
+TABLE_HTML = """
+        <table border="1" style="border-collapse: collapse; width: 100%;">
+            <thead>
+                <tr>
+                    <th>User ID</th>
+                    <th>{heading}</th>
+                    <th>Other Genre</th>
+                    <th>Avg Other Rating</th>
+                    <th>Rating Count</th>
+                </tr>
+            </thead>
+            <tbody>
+{rows}
+            </tbody>
+        </table>
+"""
+
+
+class SummaryIndex:
+    def __init__(self, band, maxsize=4096, ttl=3600.0):
+        self.band = band
+        self.summary = SUMMARIES[band]
+        self.users = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def load_user(self, cursor, user_id):
+        """Reads one user's rows into {folded genre: (genre, rows)}, each genre's rows sorted by other genre."""
+        cursor.execute(f"""
+            SELECT {self.summary["genre_column"]}, other_genre, avg_other_rating, rating_count
+            FROM {self.summary["table"]}
+            WHERE userId = %s
+            ORDER BY {self.summary["genre_column"]}, other_genre
+        """, (user_id,))
+        genres = {}
+        for genre, other_genre, avg_other_rating, rating_count in cursor.fetchall():
+            # Folded keys answer "drama" for "Drama", as the case-insensitive SQL lookup did
+            _, rows = genres.setdefault(genre.casefold(), (genre, []))
+            rows.append({"other_genre": other_genre, "avg_other_rating": avg_other_rating, "rating_count": rating_count})
+        return genres
+
+    def lookup(self, cursor_factory, user_id, genre, stamp):
+        """Returns (genre as stored, rows) for one user and genre; only a user missing for this stamp costs a query."""
+        key = (user_id, stamp)
+        genres = self.users.get(key)
+        if genres is None:
+            with cursor_factory() as (conn, cursor):
+                genres = self.load_user(cursor, user_id)
+            self.users.set(key, genres)
+        return genres.get(genre.casefold(), (genre, []))
+
+    def render_html(self, user_id, genre, rows):
+        """The legacy HTML table for a lookup, joined in one pass with names escaped."""
+        cells = "".join(
+            f"<tr><td>{user_id}</td><td>{escape(genre)}</td><td>{escape(row['other_genre'])}</td>"
+            f"<td>{row['avg_other_rating']:.1f}</td><td>{row['rating_count']}</td></tr>"
+            for row in rows
+        )
+        return TABLE_HTML.format(heading=f"{self.band.title()} Rated Genre", rows=cells)
+
+    def stats(self):
+        return self.users.stats()
@@ -20,8 +20,23 @@ CREATE TABLE IF NOT EXISTS movies (
     poster_url VARCHAR(500) DEFAULT NULL,
     avg_rating FLOAT DEFAULT NULL,  -- ✅ RESTORED avg_rating
     runtime VARCHAR(50) DEFAULT NULL,
+    runtime_minutes INT DEFAULT NULL,  -- parsed from runtime ("81 min") so /search can filter on an index
     language_id INT DEFAULT NULL,
-    FOREIGN KEY (language_id) REFERENCES languages(id) ON DELETE SET NULL
+    genre_signature VARCHAR(255) DEFAULT NULL,  -- sorted genre ids, e.g. "1,5,12"
+    -- Copies of the awards table's counts, so award filters need no join
+    oscars_won INT NOT NULL DEFAULT 0,
+    golden_globes_won INT NOT NULL DEFAULT 0,
+    baftas_won INT NOT NULL DEFAULT 0,
+    FOREIGN KEY (language_id) REFERENCES languages(id) ON DELETE SET NULL,
+    FULLTEXT INDEX ft_movies_title (title) WITH PARSER ngram,  -- title search in /search and /movie_details
+    -- /search filter columns; each index ends in movieId so filtering on ids never touches the rows
+    INDEX idx_movies_avg_rating (avg_rating, movieId),
+    INDEX idx_movies_release_date (release_date, movieId),
+    INDEX idx_movies_runtime_minutes (runtime_minutes, movieId),
+    INDEX idx_movies_language (language_id, movieId),
+    INDEX idx_movies_oscars (oscars_won, movieId),
+    INDEX idx_movies_golden_globes (golden_globes_won, movieId),
+    INDEX idx_movies_baftas (baftas_won, movieId)
 );
 
 
@@ -94,9 +109,28 @@ CREATE TABLE IF NOT EXISTS user_ratings (
     movieId INT NOT NULL,
     rating FLOAT NOT NULL,
     timestamp BIGINT,
+    FOREIGN KEY (movieId) REFERENCES movies(movieId) ON DELETE CASCADE,
+    UNIQUE KEY uq_user_ratings_user_movie (userId, movieId),  -- one rating per user and movie
+    INDEX idx_user_ratings_user (userId, movieId, rating)  -- one user's history, for incremental summaries
+);
+
+-- Running per-movie rating aggregates, kept current as ratings arrive so
+-- movies.avg_rating never needs a full recomputation
+CREATE TABLE IF NOT EXISTS movie_rating_stats (
+    movieId INT NOT NULL PRIMARY KEY,
+    rating_sum DOUBLE NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
     FOREIGN KEY (movieId) REFERENCES movies(movieId) ON DELETE CASCADE
 );
 
+-- Rating aggregates per exact genre set (movies.genre_signature), so
+-- /predict_rating is a single primary-key lookup
+CREATE TABLE IF NOT EXISTS genre_signature_stats (
+    signature VARCHAR(255) NOT NULL PRIMARY KEY,
+    rating_sum DOUBLE NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0
+);
+
 -- Create Tags Table
 CREATE TABLE IF NOT EXISTS tags (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -135,4 +169,64 @@ CREATE TABLE IF NOT EXISTS planner_list_movies (
     FOREIGN KEY (list_id) REFERENCES planner_lists(id) ON DELETE CASCADE,
     FOREIGN KEY (movieId) REFERENCES movies(movieId) ON DELETE CASCADE,
     UNIQUE KEY unique_movie_in_list (list_id, movieId, genre)
+);
+
+-- Tracks how far import_data.py got through each source CSV (per byte-range shard),
+-- committed together with the rows it covers so restarts resume where they stopped
+CREATE TABLE IF NOT EXISTS import_progress (
+    source VARCHAR(100) NOT NULL,  -- Table the CSV fills, e.g. user_ratings
+    shard INT NOT NULL DEFAULT 0,
+    start_offset BIGINT NOT NULL DEFAULT 0,
+    end_offset BIGINT NOT NULL,
+    byte_offset BIGINT NOT NULL DEFAULT 0,  -- End of the last committed row
+    rows_committed BIGINT NOT NULL DEFAULT 0,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, shard)
+);
+
+-- Running rating sums and counts per user and genre, so a new rating only
+-- recomputes that user's rows in low_rated_summary / high_rated_summary
+CREATE TABLE IF NOT EXISTS user_genre_totals (
+    userId INT NOT NULL,
+    genreId INT NOT NULL,
+    rating_sum DOUBLE NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (userId, genreId),
+    FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+);
+
+-- How many of a user's ratings of a genre's movies have each rating value, so a
+-- new rating only adds to one bucket per genre and quartiles stay exact
+CREATE TABLE IF NOT EXISTS user_genre_rating_histogram (
+    userId INT NOT NULL,
+    genreId INT NOT NULL,
+    rating FLOAT NOT NULL,
+    rating_count INT NOT NULL,
+    PRIMARY KEY (userId, genreId, rating),
+    FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+);
+
+-- Box plot statistics per user and genre behind /analyze/user_genre_rating_boxplot,
+-- derived from user_genre_rating_histogram
+CREATE TABLE IF NOT EXISTS user_genre_stats (
+    userId INT NOT NULL,
+    genreId INT NOT NULL,
+    rating_count INT NOT NULL,
+    rating_min FLOAT NOT NULL,
+    q1 DOUBLE NOT NULL,
+    median DOUBLE NOT NULL,
+    q3 DOUBLE NOT NULL,
+    rating_max FLOAT NOT NULL,
+    mean DOUBLE NOT NULL,
+    PRIMARY KEY (userId, genreId),
+    FOREIGN KEY (genreId) REFERENCES genres(id) ON DELETE CASCADE
+);
+
+-- Version counter per table, bumped by the importer and the app whenever they
+-- change it, so the app's response caches know when to rebuild
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
\ No newline at end of file